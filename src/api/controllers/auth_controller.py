@@ -8,7 +8,7 @@ from services.auth_service import (
     VerificationCodeInvalidError,
     UserAlreadyVerifiedError
 )
-from services.email_service import EmailService
+from services.email_service import get_email_service
 from infrastructure.repositories.user_repository import UserRepository
 from infrastructure.databases.mssql import session
 from api.schemas.auth_schemas import (
@@ -23,7 +23,7 @@ bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
 # Initialize services
 user_repository = UserRepository(session)
-email_service = EmailService()
+email_service = get_email_service()
 auth_service = AuthService(user_repository, email_service)
 
 # Schemas are imported from auth_schemas.py
@@ -390,19 +390,7 @@ def refresh():
     """
     try:
         # Get user ID from refresh token
-        current_user_id = get_jwt_identity()
-
-        # Handle both old format (string) and new format (JSON)
-        if isinstance(current_user_id, str):
-            try:
-                import json
-                identity_data = json.loads(current_user_id)
-                user_id_str = str(identity_data["user_id"])
-            except (json.JSONDecodeError, KeyError):
-                # Old format - just user_id as string
-                user_id_str = current_user_id
-        else:
-            user_id_str = str(current_user_id)
+        user_id_str = str(get_current_user_id())
 
         # Use AuthService to generate new access token
         result = auth_service.refresh_token(user_id_str)
@@ -6,9 +6,11 @@ from datetime import datetime
 from services.support_service import SupportService
 from infrastructure.repositories.support_repository import SupportRepository
 from infrastructure.repositories.user_repository import UserRepository
-from services.email_service import EmailService
+from infrastructure.repositories.outbox_repository import OutboxRepository
+from services.email_service import get_email_service
 from infrastructure.databases.mssql import session
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +19,12 @@ bp = Blueprint('support', __name__, url_prefix='/api/support')
 # Initialize services
 support_repository = SupportRepository(session)
 user_repository = UserRepository(session)
-email_service = EmailService()
-support_service = SupportService(support_repository, user_repository, email_service)
+email_service = get_email_service()
+# Admin notifications go through the outbox table when enabled; the emails are
+# then sent by scripts/support_outbox_worker.py instead of the request thread
+use_outbox = os.getenv('SUPPORT_NOTIFICATION_OUTBOX', 'False').lower() == 'true'
+support_service = SupportService(support_repository, user_repository, email_service,
+                                 OutboxRepository(session) if use_outbox else None)
 
 # Schemas
 class SupportCreateSchema(Schema):
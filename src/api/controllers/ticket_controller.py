@@ -15,6 +15,22 @@ user_service = UserService(UserRepository(session))
 request_schema = TicketRequestSchema()
 response_schema = TicketResponseSchema()
 
+# Upper bound for the ?limit= page size on list/search endpoints
+MAX_PAGE_LIMIT = 100
+
+
+def _limit_arg(default: int):
+    """Read ?limit= clamped to [1, MAX_PAGE_LIMIT]; None if it is not an integer"""
+    raw = request.args.get('limit')
+    if raw is None or raw == '':
+        return default
+    try:
+        limit = int(raw)
+    except ValueError:
+        return None
+    return max(1, min(limit, MAX_PAGE_LIMIT))
+
+
 @bp.route('/', methods=['GET'])
 def list_tickets():
     """
@@ -515,6 +531,22 @@ def search_tickets():
           schema:
             type: string
           description: Event name to search, required
+        - name: limit
+          in: query
+          schema:
+            type: integer
+            default: 50
+          description: Number of results to return
+        - name: after_price
+          in: query
+          schema:
+            type: number
+          description: Price of the last ticket on the previous page (keyset cursor)
+        - name: after_id
+          in: query
+          schema:
+            type: integer
+          description: TicketID of the last ticket on the previous page (keyset cursor)
       tags:
         - Tickets
       responses:
@@ -550,7 +582,15 @@ def search_tickets():
         if not event_name:
             return jsonify({"message": "event_name parameter is required"}), 400
         
-        tickets = ticket_service.search_tickets_by_event_name(event_name)
+        limit = _limit_arg(50)
+        if limit is None:
+            return jsonify({"message": "limit must be an integer"}), 400
+        after_price = request.args.get('after_price', type=float)
+        after_id = request.args.get('after_id', type=int)
+        
+        tickets = ticket_service.search_tickets_by_event_name(
+            event_name, limit, after_price, after_id
+        )
         return jsonify(response_schema.dump(tickets, many=True)), 200
     except Exception as e:
         return jsonify({"message": "Error searching tickets", "error": str(e)}), 500
@@ -606,6 +646,21 @@ def search_tickets_advanced():
             type: integer
             default: 50
           description: Number of results to return
+        - name: after_rating
+          in: query
+          schema:
+            type: number
+          description: Rating of the last ticket on the previous page (omit if it had no rating)
+        - name: after_price
+          in: query
+          schema:
+            type: number
+          description: Price of the last ticket on the previous page (keyset cursor)
+        - name: after_id
+          in: query
+          schema:
+            type: integer
+          description: TicketID of the last ticket on the previous page (keyset cursor)
       tags:
         - Tickets
       responses:
@@ -619,16 +674,20 @@ def search_tickets_advanced():
                   $ref: '#/components/schemas/TicketResponse'
     """
     try:
-        filters = {}
+        limit = _limit_arg(50)
+        if limit is None:
+            return jsonify({"message": "limit must be an integer"}), 400
+        filters = {'limit': limit}
         for key in ['event_name', 'event_type', 'min_price', 'max_price', 
-                   'location', 'ticket_type', 'is_negotiable', 'limit']:
+                   'location', 'ticket_type', 'is_negotiable',
+                   'after_rating', 'after_price', 'after_id']:
             value = request.args.get(key)
             if value:
-                if key in ['min_price', 'max_price']:
+                if key in ['min_price', 'max_price', 'after_rating', 'after_price']:
                     filters[key] = float(value)
                 elif key == 'is_negotiable':
                     filters[key] = value.lower() == 'true'
-                elif key == 'limit':
+                elif key == 'after_id':
                     filters[key] = int(value)
                 else:
                     filters[key] = value
@@ -665,7 +724,9 @@ def get_trending_tickets():
                   $ref: '#/components/schemas/TicketResponse'
     """
     try:
-        limit = int(request.args.get('limit', 10))
+        limit = _limit_arg(10)
+        if limit is None:
+            return jsonify({"message": "limit must be an integer"}), 400
         tickets = ticket_service.get_trending_tickets(limit)
         return jsonify(response_schema.dump(tickets, many=True)), 200
     except Exception as e:
@@ -705,7 +766,9 @@ def get_tickets_by_event_type(event_type):
                   $ref: '#/components/schemas/TicketResponse'
     """
     try:
-        limit = int(request.args.get('limit', 20))
+        limit = _limit_arg(20)
+        if limit is None:
+            return jsonify({"message": "limit must be an integer"}), 400
         tickets = ticket_service.get_tickets_by_event_type(event_type, limit)
         return jsonify(response_schema.dump(tickets, many=True)), 200
     except Exception as e:
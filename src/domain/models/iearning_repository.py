@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import List, Optional, Tuple, Dict, Any
 from domain.models.earning import Earning
 
 class IEarningRepository(ABC):
@@ -7,6 +7,10 @@ class IEarningRepository(ABC):
     def add(self, earning: Earning) -> Earning:
         pass
     
+    @abstractmethod
+    def add_many(self, earnings: List[Earning]) -> List[Earning]:
+        pass
+    
     @abstractmethod
     def get_by_id(self, earning_id: int) -> Optional[Earning]:
         pass
@@ -30,3 +34,20 @@ class IEarningRepository(ABC):
     @abstractmethod
     def get_earnings_by_date_range(self, user_id: int, start_date, end_date) -> List[Earning]:
         pass
+
+    @abstractmethod
+    def get_monthly_totals(self, user_id: int, since) -> List[Tuple[int, int, float, int]]:
+        pass
+
+    @abstractmethod
+    def get_recent(self, user_id: int, limit: int = 10) -> List[Earning]:
+        pass
+
+    @abstractmethod
+    def get_statistics_bundle(self, user_id: int, since, recent_start, previous_start,
+                              recent_limit: int = 10) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def get_summary(self, user_id: int, start_date=None, end_date=None) -> Tuple[float, int, float, float, float]:
+        pass
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime
 from domain.models.feedback import Feedback, TicketFeedback
 
 class IFeedbackRepository(ABC):
@@ -11,6 +12,14 @@ class IFeedbackRepository(ABC):
     def add_ticket_feedback(self, feedback: TicketFeedback) -> TicketFeedback:
         pass
     
+    @abstractmethod
+    def get_feedback_by_id(self, feedback_id: int) -> Optional[Feedback]:
+        pass
+
+    @abstractmethod
+    def get_ticket_feedback_by_id(self, feedback_id: int) -> Optional[TicketFeedback]:
+        pass
+    
     @abstractmethod
     def get_user_feedback(self, user_id: int, limit: int = 20, offset: int = 0) -> List[Feedback]:
         pass
@@ -23,6 +32,11 @@ class IFeedbackRepository(ABC):
     def get_average_user_rating(self, user_id: int) -> float:
         pass
     
+    @abstractmethod
+    def get_user_feedback_aggregates(self, user_id: int, recent_start: datetime,
+                                     previous_start: datetime) -> Dict[str, Any]:
+        pass
+    
     @abstractmethod
     def get_average_ticket_rating(self, ticket_id: int) -> float:
         pass
@@ -46,3 +60,7 @@ class IFeedbackRepository(ABC):
     @abstractmethod
     def get_feedback_as_seller(self, user_id: int) -> List[Feedback]:
         pass
+
+    @abstractmethod
+    def get_user_role_feedback(self, user_id: int) -> Tuple[List[Feedback], List[Feedback]]:
+        pass
@@ -0,0 +1,17 @@
+from abc import ABC, abstractmethod
+from typing import List
+from domain.models.outbox_event import OutboxEvent
+
+class IOutboxRepository(ABC):
+    @abstractmethod
+    def claim_pending(self, event_type: str, limit: int = 100, max_attempts: int = 5,
+                      lease_seconds: int = 300) -> List[OutboxEvent]:
+        pass
+
+    @abstractmethod
+    def mark_sent(self, outbox_ids: List[int]) -> None:
+        pass
+
+    @abstractmethod
+    def release(self, outbox_ids: List[int]) -> None:
+        pass
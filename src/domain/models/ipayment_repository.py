@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from domain.models.payment import Payment
+from datetime import datetime
 
 class IPaymentRepository(ABC):
     @abstractmethod
@@ -26,6 +27,10 @@ class IPaymentRepository(ABC):
     @abstractmethod
     def delete(self, payment_id: int) -> bool:
         pass
+
+    @abstractmethod
+    def update_status(self, payment_id: int, status: str, paid_at: Optional[datetime] = None) -> Optional[Payment]:
+        pass
     
     @abstractmethod
     def get_by_status(self, status: str) -> List[Payment]:
@@ -38,3 +43,19 @@ class IPaymentRepository(ABC):
     @abstractmethod
     def get_user_payments_count(self, user_id: int) -> int:
         pass
+
+    @abstractmethod
+    def get_user_stats(self, user_id: int) -> List[Tuple[str, str, int, float]]:
+        pass
+
+    @abstractmethod
+    def fail_payment_cascade(self, payment_id: int) -> Optional[Payment]:
+        pass
+
+    @abstractmethod
+    def complete_payment_cascade(self, payment_id: int) -> Optional[Payment]:
+        pass
+
+    @abstractmethod
+    def get_user_payments_page(self, user_id: int, limit: int, offset: int) -> Tuple[List[Payment], int]:
+        pass
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from domain.models.support import Support
 
 class ISupportRepository(ABC):
@@ -7,6 +7,10 @@ class ISupportRepository(ABC):
     def add(self, support: Support) -> Support:
         pass
     
+    @abstractmethod
+    def add_with_outbox(self, support: Support, event_type: str, payload: Dict[str, Any]) -> Support:
+        pass
+    
     @abstractmethod
     def get_by_id(self, support_id: int) -> Optional[Support]:
         pass
@@ -30,7 +34,15 @@ class ISupportRepository(ABC):
     @abstractmethod
     def get_all(self) -> List[Support]:
         pass
+
+    @abstractmethod
+    def get_page(self, before_id: Optional[int] = None, limit: int = 200) -> List[Support]:
+        pass
     
     @abstractmethod
     def update_status(self, support_id: int, status: str) -> bool:
         pass
+
+    @abstractmethod
+    def update_fields(self, support_id: int, **values) -> Optional[Support]:
+        pass
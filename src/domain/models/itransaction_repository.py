@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
 from domain.models.transaction import Transaction
+from domain.models.ticket import Ticket
 
 class ITransactionRepository(ABC):
     @abstractmethod
@@ -11,6 +12,10 @@ class ITransactionRepository(ABC):
     def get_by_id(self, transaction_id: int) -> Optional[Transaction]:
         pass
     
+    @abstractmethod
+    def get_with_ticket(self, transaction_id: int) -> Tuple[Optional[Transaction], Optional[Ticket]]:
+        pass
+    
     @abstractmethod
     def get_by_ticket_id(self, ticket_id: int) -> List[Transaction]:
         pass
@@ -19,10 +24,21 @@ class ITransactionRepository(ABC):
     def get_by_user_id(self, user_id: int) -> List[Transaction]:
         pass
     
+    @abstractmethod
+    def get_by_user_id_with_ticket(self, user_id: int) -> List[Tuple[Transaction, Optional[Ticket], Optional[str]]]:
+        pass
+    
     @abstractmethod
     def update(self, transaction: Transaction) -> Transaction:
         pass
     
+    @abstractmethod
+    def update_status_with_ticket(self, transaction_id: int, status: str,
+                                  payment_transaction_id: Optional[str] = None,
+                                  ticket_from: Iterable[str] = (), ticket_to: Optional[str] = None,
+                                  require_ticket: bool = False) -> Tuple[Optional[Transaction], bool]:
+        pass
+    
     @abstractmethod
     def delete(self, transaction_id: int) -> bool:
         pass
@@ -30,3 +46,11 @@ class ITransactionRepository(ABC):
     @abstractmethod
     def list(self) -> List[Transaction]:
         pass
+    
+    @abstractmethod
+    def list_page(self, after_id: int = 0, limit: int = 200) -> List[Transaction]:
+        pass
+    
+    @abstractmethod
+    def iter_all(self, batch_size: int = 1000) -> Iterator[Transaction]:
+        pass
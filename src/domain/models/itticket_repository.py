@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Iterable, List, Optional, Tuple
 from .ticket import Ticket
+from .user import User
 
 class ITicketRepository(ABC):
     @abstractmethod
@@ -15,6 +16,10 @@ class ITicketRepository(ABC):
     def get_by_event_name_and_owner(self, event_name: str, owner_username: str) -> Optional[Ticket]:
         pass
 
+    @abstractmethod
+    def get_ticket_with_parties(self, ticket_id: int, buyer_id: int) -> Tuple[Optional[Ticket], Optional[User], Optional[User]]:
+        pass
+
     @abstractmethod
     def list(self) -> List[Ticket]:
         pass
@@ -24,19 +29,30 @@ class ITicketRepository(ABC):
     def update(self, ticket: Ticket) -> Ticket:
         pass
 
+    @abstractmethod
+    def transition_status(self, ticket_id: int, from_statuses: Iterable[str], to_status: str) -> Optional[Ticket]:
+        pass
+
+    @abstractmethod
+    def try_reserve(self, ticket_id: int) -> Optional[Ticket]:
+        pass
+
     @abstractmethod
     def delete(self, ticket_id: int) -> None:
         pass
 
     @abstractmethod
-    def search_tickets_by_event_name(self, event_name: str) -> List[Ticket]:
+    def search_tickets_by_event_name(self, event_name: str, limit: int = 50,
+                                     after_price: float = None, after_id: int = None) -> List[Ticket]:
         pass
 
     @abstractmethod
     def search_tickets_advanced(self, event_name: str = None, event_type: str = None, 
                                min_price: float = None, max_price: float = None,
                                location: str = None, ticket_type: str = None,
-                               is_negotiable: bool = None, limit: int = 50) -> List[Ticket]:
+                               is_negotiable: bool = None, limit: int = 50,
+                               after_rating: float = None, after_price: float = None,
+                               after_id: int = None) -> List[Ticket]:
         pass
 
     @abstractmethod
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
+from datetime import datetime
 from .user import User
 
 class IUserRepository(ABC):
@@ -11,10 +12,18 @@ class IUserRepository(ABC):
     def get_by_email(self, email: str) -> Optional[User]:
         pass
 
+    @abstractmethod
+    def exists_by_email(self, email: str) -> bool:
+        pass
+
     @abstractmethod
     def get_by_id(self, user_id: int) -> Optional[User]:
         pass
 
+    @abstractmethod
+    def get_by_ids(self, user_ids: List[int]) -> Dict[int, User]:
+        pass
+
     @abstractmethod
     def get_by_username(self, username: str) -> Optional[User]:
         pass
@@ -22,6 +31,22 @@ class IUserRepository(ABC):
     @abstractmethod
     def update(self, user: User) -> User:
         pass
+
+    @abstractmethod
+    def update_fields(self, user_id: int, **fields) -> Optional[User]:
+        pass
+
+    @abstractmethod
+    def update_verification(self, user_id: int, code: Optional[str], expires_at: Optional[datetime]) -> bool:
+        pass
+
+    @abstractmethod
+    def mark_verified(self, user_id: int) -> bool:
+        pass
+
+    @abstractmethod
+    def update_password_hash(self, user_id: int, password_hash: str) -> bool:
+        pass
     
     @abstractmethod
     def list(self) -> List[User]:
@@ -29,4 +54,8 @@ class IUserRepository(ABC):
 
     @abstractmethod
     def delete(self, user_id: int) -> None:
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def get_submitter_and_admins(self, user_id: int, role_id: int) -> Tuple[Optional[User], List[User]]:
+        pass
@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+class OutboxEvent:
+    def __init__(
+        self,
+        OutboxID: Optional[int],
+        EventType: str,
+        Payload: Dict[str, Any],
+        Create_at: Optional[datetime],
+        Sent_at: Optional[datetime],
+        Attempts: int
+    ):
+        self.OutboxID = OutboxID
+        self.EventType = EventType
+        self.Payload = Payload
+        self.Create_at = Create_at
+        self.Sent_at = Sent_at
+        self.Attempts = Attempts
@@ -2,6 +2,9 @@ from datetime import datetime
 from typing import Optional
 
 class Payment:
+    __slots__ = ('PaymentID', 'Methods', 'Status', 'Paid_at', 'amount', 'UserID',
+                 'Title', 'TransactionID', 'transaction_reference')
+
     def __init__(
         self,
         PaymentID: Optional[int],
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 from config import Config
 from infrastructure.databases.base import Base
@@ -9,4 +9,24 @@ engine = create_engine(DATABASE_URI)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 session = SessionLocal()
 def init_mssql(app):
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    # create_all skips existing tables, so create any missing indexes separately
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    # Likewise, foreign keys of existing tables keep their generated names;
+    # rename them to the names declared on the models (matched by columns)
+    inspector = inspect(engine)
+    schema = inspector.default_schema_name
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            named = [fk for fk in table.foreign_key_constraints if isinstance(fk.name, str)]
+            if not named:
+                continue
+            for db_fk in inspector.get_foreign_keys(table.name):
+                for fk in named:
+                    if (db_fk['name'] != fk.name
+                            and db_fk['referred_table'] == fk.referred_table.name
+                            and db_fk['constrained_columns'] == list(fk.column_keys)):
+                        conn.execute(text("EXEC sp_rename :old_name, :new_name, 'OBJECT'"),
+                                     {'old_name': f"{schema}.{db_fk['name']}", 'new_name': fk.name})
\ No newline at end of file
@@ -1,10 +1,17 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index
 from sqlalchemy.sql import func
 from infrastructure.databases.base import Base
 
 class EarningModel(Base):
     __tablename__ = 'earning'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Every earning query filters by UserID and filters/sorts by Date
+        Index(
+            'IX_Earning_UserID_Date', 'UserID', 'Date',
+            mssql_include=['TotalAmount', 'EarningID']
+        ),
+        {'extend_existing': True}
+    )
 
     EarningID = Column(Integer, primary_key=True, autoincrement=True)
     UserID = Column(Integer, ForeignKey('users.UserId'), nullable=False)
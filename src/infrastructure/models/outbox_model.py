@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from sqlalchemy.sql import func
+from infrastructure.databases.base import Base
+
+class OutboxModel(Base):
+    __tablename__ = 'outbox'
+    __table_args__ = (
+        # The worker only scans unsent events, in OutboxID order
+        Index('IX_Outbox_Sent_at_OutboxID', 'Sent_at', 'OutboxID'),
+        {'extend_existing': True}
+    )
+
+    OutboxID = Column(Integer, primary_key=True, autoincrement=True)
+    EventType = Column(String(50), nullable=False)  # support_created, ...
+    Payload = Column(Text, nullable=False)  # JSON
+    Create_at = Column(DateTime, default=func.now())
+    Claimed_at = Column(DateTime, nullable=True)  # lease held by the worker processing it
+    Sent_at = Column(DateTime, nullable=True)
+    Attempts = Column(Integer, nullable=False, default=0)
@@ -1,16 +1,27 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index
 from sqlalchemy.sql import func
 from infrastructure.databases.base import Base
 
+# Named so a violation can be told apart from the driver's error text
+FK_PAYMENT_USER = 'FK_Payment_UserID'
+FK_PAYMENT_TRANSACTION = 'FK_Payment_TransactionID'
+
 class PaymentModel(Base):
     __tablename__ = 'payment'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Payment statistics group by UserID, Status, Methods
+        Index(
+            'IX_Payment_UserID_Status_Methods', 'UserID', 'Status', 'Methods',
+            mssql_include=['amount']
+        ),
+        {'extend_existing': True}
+    )
 
     PaymentID = Column(Integer, primary_key=True, autoincrement=True)
     Methods = Column(String(100), nullable=False)  # Cash, Bank Transfer, Digital Wallet, Credit Card
     Status = Column(String(20), default='pending')  # pending, success, failed, cancelled
     Paid_at = Column(DateTime)
     amount = Column(Float, nullable=False)
-    UserID = Column(Integer, ForeignKey('users.UserId'), nullable=False)
+    UserID = Column(Integer, ForeignKey('users.UserId', name=FK_PAYMENT_USER), nullable=False)
     Title = Column(String(200), nullable=False)
-    TransactionID = Column(Integer, ForeignKey('transactions.TransactionID'))
+    TransactionID = Column(Integer, ForeignKey('transactions.TransactionID', name=FK_PAYMENT_TRANSACTION))
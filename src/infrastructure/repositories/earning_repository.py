@@ -1,9 +1,9 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple, Dict, Any
 from domain.models.earning import Earning
 from domain.models.iearning_repository import IEarningRepository
 from infrastructure.models.earning_model import EarningModel
 from datetime import datetime
-from sqlalchemy import func
+from sqlalchemy import func, extract, case, and_
 
 class EarningRepository(IEarningRepository):
     def __init__(self, session=None):
@@ -31,6 +31,27 @@ class EarningRepository(IEarningRepository):
             logger.error(f"Error adding earning for user {earning.UserID}: {str(e)}")
             raise
     
+    def add_many(self, earnings: List[Earning]) -> List[Earning]:
+        """Insert many earnings in a single flush/commit"""
+        if not earnings:
+            return []
+        try:
+            models = [
+                EarningModel(UserID=e.UserID, TotalAmount=e.TotalAmount, Date=e.Date)
+                for e in earnings
+            ]
+            self.session.add_all(models)
+            self.session.flush()
+            result = [self._to_domain(model) for model in models]
+            self.session.commit()
+            return result
+        except Exception as e:
+            self.session.rollback()
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Error adding {len(earnings)} earnings: {str(e)}")
+            raise
+    
     def get_by_id(self, earning_id: int) -> Optional[Earning]:
         model = self.session.query(EarningModel).filter(EarningModel.EarningID == earning_id).first()
         return self._to_domain(model) if model else None
@@ -85,6 +106,79 @@ class EarningRepository(IEarningRepository):
         ).order_by(EarningModel.Date.desc()).all()
         return [self._to_domain(model) for model in models]
     
+    def get_monthly_totals(self, user_id: int, since: datetime) -> List[Tuple[int, int, float, int]]:
+        """Return [(year, month, sum, count)] for the user's earnings since the given date"""
+        year = extract('year', EarningModel.Date)
+        month = extract('month', EarningModel.Date)
+        rows = self.session.query(
+            year, month,
+            func.sum(EarningModel.TotalAmount),
+            func.count(EarningModel.EarningID)
+        ).filter(
+            EarningModel.UserID == user_id,
+            EarningModel.Date >= since
+        ).group_by(year, month).order_by(year, month).all()
+        return [(int(y), int(m), total or 0.0, count) for y, m, total, count in rows]
+
+    def get_recent(self, user_id: int, limit: int = 10) -> List[Earning]:
+        """Return the user's latest earnings, newest first"""
+        models = self.session.query(EarningModel).filter(
+            EarningModel.UserID == user_id
+        ).order_by(EarningModel.Date.desc()).limit(limit).all()
+        return [self._to_domain(model) for model in models]
+
+    def get_summary(self, user_id: int, start_date=None, end_date=None) -> Tuple[float, int, float, float, float]:
+        """
+        Return (SUM, COUNT, AVG, MAX, MIN) of TotalAmount within the date range;
+        start_date/end_date = None means unbounded
+        """
+        query = self.session.query(
+            func.sum(EarningModel.TotalAmount),
+            func.count(EarningModel.EarningID),
+            func.avg(EarningModel.TotalAmount),
+            func.max(EarningModel.TotalAmount),
+            func.min(EarningModel.TotalAmount)
+        ).filter(EarningModel.UserID == user_id)
+        if start_date is not None:
+            query = query.filter(EarningModel.Date >= start_date)
+        if end_date is not None:
+            query = query.filter(EarningModel.Date <= end_date)
+
+        total, count, average, highest, lowest = query.one()
+        return (total or 0.0, count or 0, average or 0.0, highest or 0.0, lowest or 0.0)
+
+    def get_statistics_bundle(self, user_id: int, since, recent_start, previous_start,
+                              recent_limit: int = 10) -> Dict[str, Any]:
+        """
+        Collect all earning statistics for a user in 3 queries (down from 5):
+        totals and both trend windows in one aggregate, then the monthly
+        breakdown and the latest earnings. Not one round-trip: that needs a
+        driver-specific multi-result batch, and the shared session can't run
+        the queries in parallel threads
+        """
+        amount = EarningModel.TotalAmount
+        total, count, average, recent_sum, previous_sum = self.session.query(
+            func.sum(amount),
+            func.count(EarningModel.EarningID),
+            func.avg(amount),
+            func.sum(case((EarningModel.Date >= recent_start, amount), else_=0)),
+            func.sum(case(
+                (and_(EarningModel.Date >= previous_start, EarningModel.Date < recent_start), amount),
+                else_=0
+            ))
+        ).filter(EarningModel.UserID == user_id).one()
+
+        return {
+            'total': total or 0.0,
+            'count': count or 0,
+            'average': average or 0.0,
+            'recent_period': recent_sum or 0.0,
+            'previous_period': previous_sum or 0.0,
+            # No earnings at all means nothing to break down
+            'monthly': self.get_monthly_totals(user_id, since) if count else [],
+            'recent': self.get_recent(user_id, recent_limit) if count else []
+        }
+
     def _to_domain(self, model: EarningModel) -> Earning:
         return Earning(
             EarningID=model.EarningID,
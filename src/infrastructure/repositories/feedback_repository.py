@@ -1,8 +1,9 @@
-from typing import List, Optional
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime
 from domain.models.feedback import Feedback, TicketFeedback
 from domain.models.ifeedback_repository import IFeedbackRepository
 from infrastructure.models.feedback_model import UserFeedbackModel, TicketFeedbackModel
-from sqlalchemy import func
+from sqlalchemy import func, case, or_
 
 class FeedbackRepository(IFeedbackRepository):
     def __init__(self, session=None):
@@ -38,6 +39,14 @@ class FeedbackRepository(IFeedbackRepository):
         self.session.refresh(model)
         return self._to_domain_ticket_feedback(model)
     
+    def get_feedback_by_id(self, feedback_id: int) -> Optional[Feedback]:
+        model = self.session.get(UserFeedbackModel, feedback_id)
+        return self._to_domain_user_feedback(model) if model else None
+
+    def get_ticket_feedback_by_id(self, feedback_id: int) -> Optional[TicketFeedback]:
+        model = self.session.get(TicketFeedbackModel, feedback_id)
+        return self._to_domain_ticket_feedback(model) if model else None
+    
     def get_user_feedback(self, user_id: int, limit: int = 20, offset: int = 0) -> List[Feedback]:
         models = self.session.query(UserFeedbackModel).filter(
             UserFeedbackModel.TargetUserID == user_id
@@ -56,6 +65,40 @@ class FeedbackRepository(IFeedbackRepository):
         ).scalar()
         return float(result) if result else 0.0
     
+    def get_user_feedback_aggregates(self, user_id: int, recent_start: datetime,
+                                     previous_start: datetime) -> Dict[str, Any]:
+        """
+        Count, average, rating histogram and the two trend windows
+        ([previous_start, recent_start) and [recent_start, now]) in one SELECT
+        """
+        rating = UserFeedbackModel.Rating
+        created = UserFeedbackModel.CreatedAt
+        bucket = func.floor(rating)
+        in_recent = created >= recent_start
+        in_previous = (created >= previous_start) & (created < recent_start)
+
+        row = self.session.query(
+            func.count(UserFeedbackModel.FeedbackID),
+            func.avg(rating),
+            *[func.sum(case((bucket == i, 1), else_=0)) for i in range(1, 6)],
+            func.sum(case((in_recent, 1), else_=0)),
+            func.sum(case((in_recent, rating), else_=0)),
+            func.sum(case((in_previous, 1), else_=0)),
+            func.sum(case((in_previous, rating), else_=0))
+        ).filter(UserFeedbackModel.TargetUserID == user_id).one()
+
+        total, average = row[0] or 0, row[1]
+        recent_count, recent_sum, previous_count, previous_sum = row[7:11]
+        return {
+            'total': total,
+            'average': float(average) if average is not None else 0.0,
+            'distribution': {i: int(row[1 + i] or 0) for i in range(1, 6)},
+            'recent_count': int(recent_count or 0),
+            'recent_sum': float(recent_sum or 0),
+            'previous_count': int(previous_count or 0),
+            'previous_sum': float(previous_sum or 0)
+        }
+    
     def get_average_ticket_rating(self, ticket_id: int) -> float:
         result = self.session.query(func.avg(TicketFeedbackModel.Rating)).filter(
             TicketFeedbackModel.TicketID == ticket_id
@@ -107,6 +150,33 @@ class FeedbackRepository(IFeedbackRepository):
         ).all()
         return [self._to_domain_user_feedback(model) for model in models]
 
+    def get_user_role_feedback(self, user_id: int) -> Tuple[List[Feedback], List[Feedback]]:
+        """
+        Feedback given by the user as buyer and as seller, from one joined query
+
+        Returns:
+            (buyer_feedback, seller_feedback)
+        """
+        from infrastructure.models.transaction_model import TransactionModel
+        rows = self.session.query(
+            UserFeedbackModel, TransactionModel.BuyerID, TransactionModel.SellerID
+        ).join(
+            TransactionModel, UserFeedbackModel.TransactionID == TransactionModel.TransactionID
+        ).filter(
+            UserFeedbackModel.ReviewerID == user_id,
+            or_(TransactionModel.BuyerID == user_id, TransactionModel.SellerID == user_id)
+        ).all()
+
+        buyer_feedback: List[Feedback] = []
+        seller_feedback: List[Feedback] = []
+        for model, buyer_id, seller_id in rows:
+            feedback = self._to_domain_user_feedback(model)
+            if buyer_id == user_id:
+                buyer_feedback.append(feedback)
+            if seller_id == user_id:
+                seller_feedback.append(feedback)
+        return buyer_feedback, seller_feedback
+
     def _to_domain_user_feedback(self, model: UserFeedbackModel) -> Feedback:
         return Feedback(
             FeedbackID=model.FeedbackID,
@@ -0,0 +1,87 @@
+import json
+from datetime import datetime, timedelta
+from typing import List
+from sqlalchemy import update, select, or_, func
+from domain.models.outbox_event import OutboxEvent
+from domain.models.ioutbox_repository import IOutboxRepository
+from infrastructure.models.outbox_model import OutboxModel
+
+class OutboxRepository(IOutboxRepository):
+    def __init__(self, session=None):
+        if session is None:
+            from infrastructure.databases.mssql import session as default_session
+            self.session = default_session
+        else:
+            self.session = session
+
+    def claim_pending(self, event_type: str, limit: int = 100, max_attempts: int = 5,
+                      lease_seconds: int = 300) -> List[OutboxEvent]:
+        """
+        Claim up to limit unsent events with one UPDATE ... RETURNING: sets
+        Claimed_at (the lease) and increments Attempts. Events whose lease is
+        held by another worker are skipped, so several processes can poll at once.
+        """
+        now = datetime.now()
+        # Repeated in the outer UPDATE: two workers may select the same ids in
+        # the subquery, but only the first UPDATE still matches once it commits
+        claimable = (
+            OutboxModel.EventType == event_type,
+            OutboxModel.Sent_at.is_(None),
+            OutboxModel.Attempts < max_attempts,
+            or_(OutboxModel.Claimed_at.is_(None),
+                OutboxModel.Claimed_at < now - timedelta(seconds=lease_seconds))
+        )
+        pending_ids = (
+            select(OutboxModel.OutboxID)
+            .where(*claimable)
+            .order_by(OutboxModel.OutboxID)
+            .limit(limit)
+            .scalar_subquery()
+        )
+        try:
+            models = self.session.execute(
+                update(OutboxModel)
+                .where(OutboxModel.OutboxID.in_(pending_ids), *claimable)
+                .values(Claimed_at=now, Attempts=OutboxModel.Attempts + 1)
+                .returning(OutboxModel)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            events = [self._to_domain(m) for m in models]
+            self.session.commit()
+            return sorted(events, key=lambda e: e.OutboxID)
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def mark_sent(self, outbox_ids: List[int]) -> None:
+        if not outbox_ids:
+            return
+        self.session.execute(
+            update(OutboxModel)
+            .where(OutboxModel.OutboxID.in_(outbox_ids))
+            .values(Sent_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        self.session.commit()
+
+    def release(self, outbox_ids: List[int]) -> None:
+        """Give the lease back so the next poll retries right away"""
+        if not outbox_ids:
+            return
+        self.session.execute(
+            update(OutboxModel)
+            .where(OutboxModel.OutboxID.in_(outbox_ids))
+            .values(Claimed_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        self.session.commit()
+
+    def _to_domain(self, model: OutboxModel) -> OutboxEvent:
+        return OutboxEvent(
+            OutboxID=model.OutboxID,
+            EventType=model.EventType,
+            Payload=json.loads(model.Payload),
+            Create_at=model.Create_at,
+            Sent_at=model.Sent_at,
+            Attempts=model.Attempts
+        )
@@ -1,8 +1,12 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from domain.models.payment import Payment
 from domain.models.ipayment_repository import IPaymentRepository
 from infrastructure.models.payment_model import PaymentModel
 from datetime import datetime
+from sqlalchemy import func, update, select, or_
+import logging
+
+logger = logging.getLogger(__name__)
 
 class PaymentRepository(IPaymentRepository):
     def __init__(self, session=None):
@@ -23,7 +27,11 @@ class PaymentRepository(IPaymentRepository):
             TransactionID=payment.TransactionID
         )
         self.session.add(model)
-        self.session.commit()
+        try:
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
         self.session.refresh(model)
         return self._to_domain(model)
     
@@ -41,8 +49,6 @@ class PaymentRepository(IPaymentRepository):
     
     def update(self, payment: Payment) -> Payment:
         try:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.info(f"Updating payment {payment.PaymentID} with status {payment.Status}")
             
             model = self.session.query(PaymentModel).filter(PaymentModel.PaymentID == payment.PaymentID).first()
@@ -66,18 +72,106 @@ class PaymentRepository(IPaymentRepository):
             return self._to_domain(model)
         except Exception as e:
             self.session.rollback()
-            import logging
-            logger = logging.getLogger(__name__)
             logger.error(f"Error updating payment {payment.PaymentID}: {str(e)}")
             raise
     
+    def fail_payment_cascade(self, payment_id: int) -> Optional[Payment]:
+        """
+        Mark a payment and its transaction failed and release the ticket,
+        as three UPDATEs in one commit
+        """
+        return self._cascade_status(payment_id, {'Status': 'failed'}, 'failed', 'Available')
+
+    def complete_payment_cascade(self, payment_id: int) -> Optional[Payment]:
+        """
+        Mark a payment successful (Paid_at set by the database), its
+        transaction paid and the ticket sold, as three UPDATEs in one commit
+        """
+        return self._cascade_status(payment_id, {'Status': 'success', 'Paid_at': func.current_timestamp()},
+                                    'paid', 'Sold')
+
+    def _cascade_status(self, payment_id: int, payment_values: dict,
+                        transaction_status: str, ticket_status: str) -> Optional[Payment]:
+        from infrastructure.models.transaction_model import TransactionModel
+        from infrastructure.models.Ticket_model import TicketModel
+        try:
+            # Only a payment not already in the target status is updated, so a
+            # retried (duplicate) callback doesn't rewrite all three rows
+            target_status = payment_values['Status']
+            model = self.session.execute(
+                update(PaymentModel)
+                .where(PaymentModel.PaymentID == payment_id,
+                       or_(PaymentModel.Status.is_(None), PaymentModel.Status != target_status))
+                .values(**payment_values)
+                .returning(PaymentModel)
+                .execution_options(synchronize_session=False)
+            ).scalar_one_or_none()
+            if not model:
+                self.session.rollback()
+                # Either unknown or already finalized: return it unchanged
+                return self.get_by_id(payment_id)
+            payment = self._to_domain(model)
+
+            if payment.TransactionID:
+                self.session.execute(
+                    update(TransactionModel)
+                    .where(TransactionModel.TransactionID == payment.TransactionID)
+                    .values(Status=transaction_status)
+                    .execution_options(synchronize_session=False)
+                )
+                ticket_id = (select(TransactionModel.TicketID)
+                             .where(TransactionModel.TransactionID == payment.TransactionID)
+                             .scalar_subquery())
+                self.session.execute(
+                    update(TicketModel)
+                    .where(TicketModel.TicketID == ticket_id)
+                    .values(Status=ticket_status)
+                    .execution_options(synchronize_session=False)
+                )
+
+            self.session.commit()
+            return payment
+        except Exception as e:
+            self.session.rollback()
+            logger.error(f"Error updating payment {payment_id} cascade: {str(e)}")
+            raise
+    
     def delete(self, payment_id: int) -> bool:
-        model = self.session.query(PaymentModel).filter(PaymentModel.PaymentID == payment_id).first()
-        if model:
-            self.session.delete(model)
+        # Single DELETE; rowcount tells whether the payment existed
+        deleted = self.session.query(PaymentModel).filter(
+            PaymentModel.PaymentID == payment_id
+        ).delete(synchronize_session=False)
+        self.session.commit()
+        return deleted > 0
+
+    def update_status(self, payment_id: int, status: str, paid_at: Optional[datetime] = None) -> Optional[Payment]:
+        """
+        Set a payment's status (and Paid_at, if given) with one UPDATE ... RETURNING.
+        A payment already in that state is returned without being written.
+        """
+        values = {'Status': status}
+        changed = or_(PaymentModel.Status.is_(None), PaymentModel.Status != status)
+        if paid_at is not None:
+            values['Paid_at'] = paid_at
+            changed = or_(changed, PaymentModel.Paid_at.is_(None))
+        try:
+            model = self.session.execute(
+                update(PaymentModel)
+                .where(PaymentModel.PaymentID == payment_id, changed)
+                .values(**values)
+                .returning(PaymentModel)
+                .execution_options(synchronize_session=False)
+            ).scalar_one_or_none()
+            if not model:
+                self.session.rollback()
+                # Either unknown or already in this state
+                return self.get_by_id(payment_id)
+            payment = self._to_domain(model)
             self.session.commit()
-            return True
-        return False
+            return payment
+        except Exception:
+            self.session.rollback()
+            raise
     
     def get_by_status(self, status: str) -> List[Payment]:
         models = self.session.query(PaymentModel).filter(PaymentModel.Status == status).all()
@@ -95,6 +189,40 @@ class PaymentRepository(IPaymentRepository):
     def get_user_payments_count(self, user_id: int) -> int:
         return self.session.query(PaymentModel).filter(PaymentModel.UserID == user_id).count()
     
+    def get_user_payments_page(self, user_id: int, limit: int, offset: int) -> Tuple[List[Payment], int]:
+        """
+        One page of a user's payments plus the total count, in one query via
+        COUNT(*) OVER ()
+        """
+        rows = (self.session.query(PaymentModel, func.count().over().label('total'))
+                .filter(PaymentModel.UserID == user_id)
+                .order_by(PaymentModel.PaymentID.desc())
+                .limit(limit)
+                .offset(offset)
+                .all())
+        if not rows:
+            # Past the last page the window yields no row to read the total from
+            total = self.get_user_payments_count(user_id) if offset > 0 else 0
+            return [], total
+        return [self._to_domain(model) for model, _ in rows], rows[0].total
+
+    def get_user_stats(self, user_id: int) -> List[Tuple[str, str, int, float]]:
+        """
+        Payment count and amount grouped by status and method
+
+        Returns:
+            List of (Status, Methods, count, amount)
+        """
+        rows = (self.session.query(
+                    PaymentModel.Status,
+                    PaymentModel.Methods,
+                    func.count(PaymentModel.PaymentID),
+                    func.sum(PaymentModel.amount))
+                .filter(PaymentModel.UserID == user_id)
+                .group_by(PaymentModel.Status, PaymentModel.Methods)
+                .all())
+        return [(status, method, count, float(amount or 0)) for status, method, count, amount in rows]
+    
     def _to_domain(self, model: PaymentModel) -> Payment:
         return Payment(
             PaymentID=model.PaymentID,
@@ -1,8 +1,10 @@
-from typing import List, Optional
+import json
+from typing import Any, Dict, List, Optional
 from domain.models.support import Support
 from domain.models.isupport_repository import ISupportRepository
 from infrastructure.models.support_model import SupportModel
 from datetime import datetime
+from sqlalchemy import update
 
 class SupportRepository(ISupportRepository):
     def __init__(self, session=None):
@@ -28,6 +30,37 @@ class SupportRepository(ISupportRepository):
         self.session.refresh(model)
         return self._to_domain(model)
     
+    def add_with_outbox(self, support: Support, event_type: str, payload: Dict[str, Any]) -> Support:
+        """
+        Insert the ticket and an outbox event in one transaction, so a saved
+        ticket always has its notification event. SupportID is added to the
+        payload after the flush.
+        """
+        from infrastructure.models.outbox_model import OutboxModel
+        try:
+            model = SupportModel(
+                UserID=support.UserID,
+                Status=support.Status,
+                Create_at=support.Create_at,
+                Updated_at=support.Updated_at,
+                Issue_des=support.Issue_des,
+                Title=support.Title,
+                RecipientType=support.RecipientType,
+                RecipientID=support.RecipientID
+            )
+            self.session.add(model)
+            self.session.flush()
+            self.session.add(OutboxModel(
+                EventType=event_type,
+                Payload=json.dumps(dict(payload, SupportID=model.SupportID))
+            ))
+            self.session.commit()
+            self.session.refresh(model)
+            return self._to_domain(model)
+        except Exception:
+            self.session.rollback()
+            raise
+    
     def get_by_id(self, support_id: int) -> Optional[Support]:
         model = self.session.query(SupportModel).filter(SupportModel.SupportID == support_id).first()
         return self._to_domain(model) if model else None
@@ -50,12 +83,16 @@ class SupportRepository(ISupportRepository):
         return None
     
     def delete(self, support_id: int) -> bool:
-        model = self.session.query(SupportModel).filter(SupportModel.SupportID == support_id).first()
-        if model:
-            self.session.delete(model)
+        # Single DELETE; rowcount tells whether the ticket existed
+        try:
+            deleted = self.session.query(SupportModel).filter(
+                SupportModel.SupportID == support_id
+            ).delete(synchronize_session=False)
             self.session.commit()
-            return True
-        return False
+            return deleted > 0
+        except Exception:
+            self.session.rollback()
+            raise
     
     def get_by_status(self, status: str) -> List[Support]:
         models = self.session.query(SupportModel).filter(SupportModel.Status == status).order_by(SupportModel.Create_at.desc()).all()
@@ -65,14 +102,43 @@ class SupportRepository(ISupportRepository):
         models = self.session.query(SupportModel).order_by(SupportModel.Create_at.desc()).all()
         return [self._to_domain(model) for model in models]
     
+    def get_page(self, before_id: Optional[int] = None, limit: int = 200) -> List[Support]:
+        # Keyset pagination by descending SupportID (newest first) instead of reading the whole table
+        query = self.session.query(SupportModel)
+        if before_id is not None:
+            query = query.filter(SupportModel.SupportID < before_id)
+        models = query.order_by(SupportModel.SupportID.desc()).limit(limit).all()
+        return [self._to_domain(model) for model in models]
+    
     def update_status(self, support_id: int, status: str) -> bool:
-        model = self.session.query(SupportModel).filter(SupportModel.SupportID == support_id).first()
-        if model:
-            model.Status = status
-            model.Updated_at = datetime.now()
+        # Single UPDATE; rowcount tells whether the ticket exists
+        try:
+            updated = self.session.query(SupportModel).filter(
+                SupportModel.SupportID == support_id
+            ).update({'Status': status, 'Updated_at': datetime.now()}, synchronize_session=False)
+            self.session.commit()
+            return updated > 0
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def update_fields(self, support_id: int, **values) -> Optional[Support]:
+        """Set the given columns (and Updated_at) with one UPDATE ... RETURNING"""
+        values['Updated_at'] = datetime.now()
+        try:
+            model = self.session.execute(
+                update(SupportModel)
+                .where(SupportModel.SupportID == support_id)
+                .values(**values)
+                .returning(SupportModel)
+                .execution_options(synchronize_session=False)
+            ).scalar_one_or_none()
+            result = self._to_domain(model) if model else None
             self.session.commit()
-            return True
-        return False
+            return result
+        except Exception:
+            self.session.rollback()
+            raise
     
     def _to_domain(self, model: SupportModel) -> Support:
         return Support(
@@ -1,9 +1,14 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import update, and_, or_
+from sqlalchemy.orm import Session, raiseload, aliased
 from infrastructure.databases.mssql import session
 from infrastructure.models.Ticket_model import TicketModel
 from domain.models.ticket import Ticket
+from domain.models.user import User
 from domain.models.itticket_repository import ITicketRepository
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class TicketRepository(ITicketRepository):
@@ -23,6 +28,10 @@ class TicketRepository(ITicketRepository):
             OwnerID=model.OwnerID
         )
 
+    def _read_query(self):
+        """Query chỉ đọc: raiseload('*') để lazy load ngoài ý muốn (N+1) báo lỗi ngay"""
+        return self.session.query(TicketModel).options(raiseload('*'))
+
     # Domain -> ORM
     def _to_orm(self, ticket: Ticket) -> TicketModel:
         return TicketModel(
@@ -51,7 +60,7 @@ class TicketRepository(ITicketRepository):
 
     def get_by_id(self, ticket_id: int) -> Optional[Ticket]:
         model = (
-            self.session.query(TicketModel)
+            self._read_query()
             .filter_by(TicketID=ticket_id)
             .first()
         )
@@ -62,7 +71,7 @@ class TicketRepository(ITicketRepository):
         from infrastructure.models.user_model import UserModel
 
         # Join với user table để lấy ticket theo event_name và owner username
-        result = self.session.query(TicketModel).join(
+        result = self._read_query().join(
             UserModel, TicketModel.OwnerID == UserModel.UserId
         ).filter(
             TicketModel.EventName == event_name,
@@ -71,52 +80,104 @@ class TicketRepository(ITicketRepository):
 
         return self._to_domain(result) if result else None
 
+    def get_ticket_with_parties(self, ticket_id: int, buyer_id: int) -> Tuple[Optional[Ticket], Optional[User], Optional[User]]:
+        """Ticket, buyer và seller (chủ vé) trong một câu SELECT có join"""
+        from infrastructure.models.user_model import UserModel
+        from infrastructure.repositories.user_repository import UserRepository
+
+        buyer_alias = aliased(UserModel)
+        seller_alias = aliased(UserModel)
+        row = self.session.query(TicketModel, buyer_alias, seller_alias).outerjoin(
+            buyer_alias, buyer_alias.UserId == buyer_id
+        ).outerjoin(
+            seller_alias, seller_alias.UserId == TicketModel.OwnerID
+        ).filter(TicketModel.TicketID == ticket_id).first()
+        if not row:
+            return None, None, None
+
+        ticket_model, buyer_model, seller_model = row
+        to_user = UserRepository(self.session)._to_domain
+        return (
+            self._to_domain(ticket_model),
+            to_user(buyer_model) if buyer_model else None,
+            to_user(seller_model) if seller_model else None
+        )
+
     def list(self) -> List[Ticket]:
-        models = self.session.query(TicketModel).all()
+        models = self._read_query().all()
         return [self._to_domain(m) for m in models]
 
     def update(self, ticket: Ticket) -> Ticket:
         try:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.info(f"Updating ticket {ticket.TicketID} with status {ticket.Status}")
-            
-            model = (
-                self.session.query(TicketModel)
-                .filter_by(TicketID=ticket.TicketID)
-                .first()
+
+            # Một câu UPDATE ... OUTPUT duy nhất thay cho SELECT + flush + refresh
+            stmt = (
+                update(TicketModel)
+                .where(TicketModel.TicketID == ticket.TicketID)
+                .values(
+                    EventDate=ticket.EventDate,
+                    Price=ticket.Price,
+                    EventName=ticket.EventName,
+                    Status=ticket.Status,
+                    PaymentMethod=ticket.PaymentMethod,
+                    ContactInfo=ticket.ContactInfo,
+                    OwnerID=ticket.OwnerID
+                )
+                .returning(TicketModel)
+                .execution_options(synchronize_session=False)
             )
+            model = self.session.execute(stmt).scalar_one_or_none()
             if not model:
                 logger.error(f"Ticket not found with ID: {ticket.TicketID}")
                 raise ValueError("Ticket not found")
 
-            logger.info(f"Current ticket status: {model.Status}, updating to: {ticket.Status}")
-            
-            model.EventDate = ticket.EventDate
-            model.Price = ticket.Price
-            model.EventName = ticket.EventName
-            model.Status = ticket.Status
-            model.PaymentMethod = ticket.PaymentMethod
-            model.ContactInfo = ticket.ContactInfo
-            model.OwnerID = ticket.OwnerID
-
+            result = self._to_domain(model)
             self.session.commit()
-            self.session.refresh(model)
-            logger.info(f"Ticket {ticket.TicketID} updated successfully, new status: {model.Status}")
-            return self._to_domain(model)
+            logger.info(f"Ticket {ticket.TicketID} updated successfully, new status: {result.Status}")
+            return result
         except Exception as e:
             self.session.rollback()
-            import logging
-            logger = logging.getLogger(__name__)
             logger.error(f"Error updating ticket {ticket.TicketID}: {str(e)}")
             raise
         finally:
             self.session.close()
 
+    def transition_status(self, ticket_id: int, from_statuses: Iterable[str], to_status: str) -> Optional[Ticket]:
+        """
+        Đổi trạng thái vé chỉ khi trạng thái hiện tại nằm trong from_statuses:
+        UPDATE ... SET Status = ? WHERE TicketID = ? AND Status IN (...) OUTPUT ...
+        Kiểm tra và ghi nằm trong cùng một câu lệnh nên hai request đồng thời
+        không thể cùng chuyển trạng thái.
+
+        Returns:
+            Ticket sau khi cập nhật, hoặc None nếu vé không tồn tại / sai trạng thái
+        """
+        try:
+            stmt = (
+                update(TicketModel)
+                .where(and_(TicketModel.TicketID == ticket_id,
+                            TicketModel.Status.in_(list(from_statuses))))
+                .values(Status=to_status)
+                .returning(TicketModel)
+                .execution_options(synchronize_session=False)
+            )
+            model = self.session.execute(stmt).scalar_one_or_none()
+            result = self._to_domain(model) if model else None
+            self.session.commit()
+            return result
+        except Exception:
+            self.session.rollback()
+            raise
+        finally:
+            self.session.close()
+
+    def try_reserve(self, ticket_id: int) -> Optional[Ticket]:
+        """Available -> Reserved; None nếu request khác đã giữ vé trước"""
+        return self.transition_status(ticket_id, ('Available',), 'Reserved')
+
     def delete(self, ticket_id: int) -> None:
         """Hard delete ticket and all related data"""
-        import logging
-        logger = logging.getLogger(__name__)
 
         try:
             model = (
@@ -147,8 +208,6 @@ class TicketRepository(ITicketRepository):
 
     def _delete_ticket_related_data(self, ticket_id: int):
         """Delete all data related to a ticket"""
-        import logging
-        logger = logging.getLogger(__name__)
 
         try:
             # Import models here to avoid circular imports
@@ -204,16 +263,17 @@ class TicketRepository(ITicketRepository):
     def get_tickets_by_owner(self, owner_id: int) -> List[Ticket]:
         """Get tickets by owner ID"""
         models = (
-            self.session.query(TicketModel)
+            self._read_query()
             .filter_by(OwnerID=owner_id)
             .order_by(TicketModel.EventDate.desc())
             .all()
         )
         return [self._to_domain(m) for m in models]
 
-    def search_tickets_by_event_name(self, event_name: str, limit: int = 50) -> List[Ticket]:
-        """Search tickets by event name only with pagination"""
-        query = self.session.query(TicketModel)
+    def search_tickets_by_event_name(self, event_name: str, limit: int = 50,
+                                     after_price: float = None, after_id: int = None) -> List[Ticket]:
+        """Search tickets by event name only with keyset pagination"""
+        query = self._read_query()
         
         # Tìm kiếm theo tên sự kiện (không phân biệt hoa thường)
         query = query.filter(TicketModel.EventName.ilike(f"%{event_name}%"))
@@ -221,8 +281,12 @@ class TicketRepository(ITicketRepository):
         # Chỉ hiển thị tickets Available
         query = query.filter(TicketModel.Status == 'Available')
         
-        # Sắp xếp theo giá tăng dần
-        query = query.order_by(TicketModel.Price.asc())
+        # Keyset pagination: tiếp tục sau (Price, TicketID) của trang trước thay vì OFFSET
+        if after_id is not None and after_price is not None:
+            query = query.filter(self._after_price_key(after_price, after_id))
+        
+        # Sắp xếp theo giá tăng dần, TicketID để thứ tự ổn định giữa các trang
+        query = query.order_by(TicketModel.Price.asc(), TicketModel.TicketID.asc())
         
         # Giới hạn số lượng kết quả
         query = query.limit(limit)
@@ -233,9 +297,11 @@ class TicketRepository(ITicketRepository):
     def search_tickets_advanced(self, event_name: str = None, event_type: str = None, 
                                min_price: float = None, max_price: float = None,
                                location: str = None, ticket_type: str = None,
-                               is_negotiable: bool = None, limit: int = 50) -> List[Ticket]:
-        """Advanced search with multiple filters"""
-        query = self.session.query(TicketModel)
+                               is_negotiable: bool = None, limit: int = 50,
+                               after_rating: float = None, after_price: float = None,
+                               after_id: int = None) -> List[Ticket]:
+        """Advanced search with multiple filters and keyset pagination"""
+        query = self._read_query()
         
         if event_name:
             query = query.filter(TicketModel.EventName.ilike(f"%{event_name}%"))
@@ -261,8 +327,25 @@ class TicketRepository(ITicketRepository):
         # Chỉ hiển thị tickets Available
         query = query.filter(TicketModel.Status == 'Available')
         
+        # Keyset pagination theo (Rating DESC NULLS LAST, Price ASC, TicketID ASC).
+        # after_rating = None nghĩa là trang trước kết thúc trong nhóm chưa có rating.
+        if after_id is not None and after_price is not None:
+            price_key = self._after_price_key(after_price, after_id)
+            if after_rating is None:
+                query = query.filter(and_(TicketModel.Rating.is_(None), price_key))
+            else:
+                query = query.filter(or_(
+                    TicketModel.Rating < after_rating,
+                    TicketModel.Rating.is_(None),
+                    and_(TicketModel.Rating == after_rating, price_key)
+                ))
+        
         # Sắp xếp theo rating giảm dần, sau đó theo giá tăng dần
-        query = query.order_by(TicketModel.Rating.desc().nullslast(), TicketModel.Price.asc())
+        query = query.order_by(
+            TicketModel.Rating.desc().nullslast(),
+            TicketModel.Price.asc(),
+            TicketModel.TicketID.asc()
+        )
         
         # Giới hạn số lượng kết quả
         query = query.limit(limit)
@@ -270,10 +353,18 @@ class TicketRepository(ITicketRepository):
         models = query.all()
         return [self._to_domain(m) for m in models]
 
+    @staticmethod
+    def _after_price_key(after_price: float, after_id: int):
+        """Điều kiện keyset: các dòng đứng sau (after_price, after_id) theo (Price ASC, TicketID ASC)"""
+        return or_(
+            TicketModel.Price > after_price,
+            and_(TicketModel.Price == after_price, TicketModel.TicketID > after_id)
+        )
+
     def get_tickets_by_event_type(self, event_type: str, limit: int = 20) -> List[Ticket]:
         """Get tickets by event type"""
         models = (
-            self.session.query(TicketModel)
+            self._read_query()
             .filter_by(EventType=event_type, Status='Available')
             .order_by(TicketModel.EventDate.asc())
             .limit(limit)
@@ -284,7 +375,7 @@ class TicketRepository(ITicketRepository):
     def get_trending_tickets(self, limit: int = 10) -> List[Ticket]:
         """Get trending tickets based on view count and rating"""
         models = (
-            self.session.query(TicketModel)
+            self._read_query()
             .filter_by(Status='Available')
             .order_by(TicketModel.ViewCount.desc(), TicketModel.Rating.desc().nullslast())
             .limit(limit)
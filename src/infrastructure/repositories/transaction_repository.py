@@ -1,8 +1,13 @@
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import update, or_
 from domain.models.transaction import Transaction
+from domain.models.ticket import Ticket
 from domain.models.itransaction_repository import ITransactionRepository
 from infrastructure.models.transaction_model import TransactionModel
 from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 class TransactionRepository(ITransactionRepository):
     def __init__(self, session=None):
@@ -32,6 +37,18 @@ class TransactionRepository(ITransactionRepository):
         model = self.session.query(TransactionModel).filter(TransactionModel.TransactionID == transaction_id).first()
         return self._to_domain(model) if model else None
     
+    def get_with_ticket(self, transaction_id: int) -> Tuple[Optional[Transaction], Optional[Ticket]]:
+        """Transaction and its ticket from one joined SELECT"""
+        from infrastructure.models.Ticket_model import TicketModel
+        row = self.session.query(TransactionModel, TicketModel).outerjoin(
+            TicketModel, TicketModel.TicketID == TransactionModel.TicketID
+        ).filter(TransactionModel.TransactionID == transaction_id).first()
+        if not row:
+            return None, None
+
+        model, ticket_model = row
+        return self._to_domain(model), self._ticket_to_domain(ticket_model)
+    
     def get_by_ticket_id(self, ticket_id: int) -> List[Transaction]:
         models = self.session.query(TransactionModel).filter(TransactionModel.TicketID == ticket_id).all()
         return [self._to_domain(model) for model in models]
@@ -42,10 +59,35 @@ class TransactionRepository(ITransactionRepository):
         ).all()
         return [self._to_domain(model) for model in models]
 
+    def get_by_user_id_with_ticket(self, user_id: int) -> List[Tuple[Transaction, Optional[Ticket], Optional[str]]]:
+        """
+        A user's transactions with their ticket and the other party's username,
+        from one joined SELECT instead of one ticket/user lookup per row
+
+        Returns:
+            List of (transaction, ticket or None, counterparty username or None)
+        """
+        from sqlalchemy import case
+        from infrastructure.models.Ticket_model import TicketModel
+        from infrastructure.models.user_model import UserModel
+        counterparty_id = case(
+            (TransactionModel.BuyerID == user_id, TransactionModel.SellerID),
+            else_=TransactionModel.BuyerID
+        )
+        rows = self.session.query(TransactionModel, TicketModel, UserModel.UserName).outerjoin(
+            TicketModel, TicketModel.TicketID == TransactionModel.TicketID
+        ).outerjoin(
+            UserModel, UserModel.UserId == counterparty_id
+        ).filter(
+            (TransactionModel.BuyerID == user_id) | (TransactionModel.SellerID == user_id)
+        ).all()
+        return [
+            (self._to_domain(model), self._ticket_to_domain(ticket_model), counterparty)
+            for model, ticket_model, counterparty in rows
+        ]
+
     def update(self, transaction: Transaction) -> Transaction:
         try:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.info(f"Updating transaction {transaction.TransactionID} with status {transaction.Status}")
             
             model = self.session.query(TransactionModel).filter(TransactionModel.TransactionID == transaction.TransactionID).first()
@@ -69,11 +111,64 @@ class TransactionRepository(ITransactionRepository):
             return self._to_domain(model)
         except Exception as e:
             self.session.rollback()
-            import logging
-            logger = logging.getLogger(__name__)
             logger.error(f"Error updating transaction {transaction.TransactionID}: {str(e)}")
             raise
     
+    def update_status_with_ticket(self, transaction_id: int, status: str,
+                                  payment_transaction_id: Optional[str] = None,
+                                  ticket_from: Iterable[str] = (), ticket_to: Optional[str] = None,
+                                  require_ticket: bool = False) -> Tuple[Optional[Transaction], bool]:
+        """
+        Set a transaction's status and move its ticket ticket_from -> ticket_to,
+        both in one DB transaction. The transaction UPDATE has WHERE Status != ?,
+        so a duplicate callback is a no-op. With require_ticket, a ticket not in
+        ticket_from aborts both updates with ValueError.
+
+        Returns:
+            (transaction, True) if updated; (current transaction or None, False) otherwise
+        """
+        from infrastructure.models.Ticket_model import TicketModel
+        try:
+            values = {'Status': status, 'UpdatedAt': datetime.now()}
+            if payment_transaction_id:
+                values['PaymentTransactionID'] = payment_transaction_id
+            model = self.session.execute(
+                update(TransactionModel)
+                .where(TransactionModel.TransactionID == transaction_id,
+                       or_(TransactionModel.Status.is_(None), TransactionModel.Status != status))
+                .values(**values)
+                .returning(TransactionModel)
+                .execution_options(synchronize_session=False)
+            ).scalar_one_or_none()
+            if not model:
+                self.session.rollback()
+                # Either unknown or already in that status: return it unchanged
+                return self.get_by_id(transaction_id), False
+            transaction = self._to_domain(model)
+
+            if ticket_to:
+                moved = self.session.execute(
+                    update(TicketModel)
+                    .where(TicketModel.TicketID == transaction.TicketID,
+                           TicketModel.Status.in_(list(ticket_from)))
+                    .values(Status=ticket_to)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if not moved and require_ticket:
+                    current = self.session.query(TicketModel.Status).filter(
+                        TicketModel.TicketID == transaction.TicketID
+                    ).scalar()
+                    self.session.rollback()
+                    if current is None:
+                        raise ValueError(f"Ticket {transaction.TicketID} not found")
+                    raise ValueError(f"Cannot complete transaction - ticket status is {current}")
+
+            self.session.commit()
+            return transaction, True
+        except Exception:
+            self.session.rollback()
+            raise
+    
     def delete(self, transaction_id: int) -> bool:
         model = self.session.query(TransactionModel).filter(TransactionModel.TransactionID == transaction_id).first()
         if model:
@@ -86,6 +181,35 @@ class TransactionRepository(ITransactionRepository):
         models = self.session.query(TransactionModel).all()
         return [self._to_domain(model) for model in models]
     
+    def list_page(self, after_id: int = 0, limit: int = 200) -> List[Transaction]:
+        """Keyset page: WHERE TransactionID > ? ORDER BY TransactionID, no OFFSET scan"""
+        models = self.session.query(TransactionModel).filter(
+            TransactionModel.TransactionID > after_id
+        ).order_by(TransactionModel.TransactionID.asc()).limit(limit).all()
+        return [self._to_domain(model) for model in models]
+    
+    def iter_all(self, batch_size: int = 1000) -> Iterator[Transaction]:
+        """Stream every transaction, batch_size rows at a time, without loading the table into memory"""
+        query = self.session.query(TransactionModel).order_by(
+            TransactionModel.TransactionID.asc()
+        ).execution_options(stream_results=True).yield_per(batch_size)
+        for model in query:
+            yield self._to_domain(model)
+    
+    def _ticket_to_domain(self, ticket_model) -> Optional[Ticket]:
+        if not ticket_model:
+            return None
+        return Ticket(
+            TicketID=ticket_model.TicketID,
+            EventDate=ticket_model.EventDate,
+            Price=ticket_model.Price,
+            EventName=ticket_model.EventName,
+            Status=ticket_model.Status,
+            PaymentMethod=ticket_model.PaymentMethod,
+            ContactInfo=ticket_model.ContactInfo,
+            OwnerID=ticket_model.OwnerID
+        )
+    
     def _to_domain(self, model: TransactionModel) -> Transaction:
         return Transaction(
             TransactionID=model.TransactionID,
@@ -1,10 +1,25 @@
-from typing import List, Optional
+from typing import List, Optional, Dict, Tuple
+from datetime import datetime
+from sqlalchemy import update, or_
 from sqlalchemy.orm import Session
 from infrastructure.databases.mssql import session
 from infrastructure.models.user_model import UserModel
 from domain.models.user import User
 from domain.models.iuser_repository import IUserRepository
 
+# Domain field -> column that update_fields is allowed to change
+_UPDATABLE_COLUMNS = {
+    'phone_number': 'Phone_Number',
+    'username': 'UserName',
+    'status': 'Status',
+    'email': 'Email',
+    'date_of_birth': 'Date_Of_Birth',
+    'role_id': 'RoleID',
+    'verified': 'verified',
+    'verification_code': 'verification_code',
+    'verification_expires_at': 'verification_expires_at'
+}
+
 
 class UserRepository(IUserRepository):
     def __init__(self, session: Session = session):
@@ -61,10 +76,21 @@ class UserRepository(IUserRepository):
         model = self.session.query(UserModel).filter_by(Email=email).first()
         return self._to_domain(model) if model else None
 
+    def exists_by_email(self, email: str) -> bool:
+        """Check email existence via the unique Email index without loading the row"""
+        return self.session.query(UserModel.UserId).filter_by(Email=email).first() is not None
+
     def get_by_id(self, user_id: int) -> Optional[User]:
         model = self.session.query(UserModel).filter_by(UserId=user_id).first()
         return self._to_domain(model) if model else None
 
+    def get_by_ids(self, user_ids: List[int]) -> Dict[int, User]:
+        """Get many users in one SELECT ... WHERE UserId IN (...), keyed by user ID"""
+        if not user_ids:
+            return {}
+        models = self.session.query(UserModel).filter(UserModel.UserId.in_(set(user_ids))).all()
+        return {m.UserId: self._to_domain(m) for m in models}
+
     def get_by_username(self, username: str) -> Optional[User]:
         """Get user by username"""
         model = self.session.query(UserModel).filter_by(UserName=username).first()
@@ -100,11 +126,90 @@ class UserRepository(IUserRepository):
         finally:
             self.session.close()
 
+    def update_fields(self, user_id: int, **fields) -> Optional[User]:
+        """
+        UPDATE ... RETURNING for just the given fields (domain User field names).
+        Fields not in _UPDATABLE_COLUMNS are ignored.
+
+        Returns:
+            The updated User, or None if the user does not exist
+        """
+        values = {_UPDATABLE_COLUMNS[k]: v for k, v in fields.items() if k in _UPDATABLE_COLUMNS}
+        if not values:
+            return self.get_by_id(user_id)
+
+        try:
+            model = self.session.execute(
+                update(UserModel)
+                .where(UserModel.UserId == user_id)
+                .values(**values)
+                .returning(UserModel)
+                .execution_options(synchronize_session=False)
+            ).scalar_one_or_none()
+            result = self._to_domain(model) if model else None
+            self.session.commit()
+            return result
+        except Exception:
+            self.session.rollback()
+            raise
+        finally:
+            self.session.close()
+
+    def _update_columns(self, user_id: int, **values) -> bool:
+        """Single UPDATE ... WHERE UserId = ? touching only the given columns"""
+        try:
+            result = self.session.execute(
+                update(UserModel)
+                .where(UserModel.UserId == user_id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            self.session.commit()
+            return result.rowcount > 0
+        except Exception:
+            self.session.rollback()
+            raise
+        finally:
+            self.session.close()
+
+    def update_verification(self, user_id: int, code: Optional[str], expires_at: Optional[datetime]) -> bool:
+        """Set a new verification code and expiry"""
+        return self._update_columns(user_id, verification_code=code, verification_expires_at=expires_at)
+
+    def mark_verified(self, user_id: int) -> bool:
+        """Mark user as verified and clear verification data"""
+        return self._update_columns(user_id, verified=True, verification_code=None, verification_expires_at=None)
+
+    def update_password_hash(self, user_id: int, password_hash: str) -> bool:
+        """Replace the stored password hash"""
+        return self._update_columns(user_id, Password=password_hash)
+
     def get_by_role_id(self, role_id: int) -> List[User]:
         """Get all users with a specific role ID"""
         models = self.session.query(UserModel).filter_by(RoleID=role_id).all()
         return [self._to_domain(m) for m in models]
 
+    def get_submitter_and_admins(self, user_id: int, role_id: int) -> Tuple[Optional[User], List[User]]:
+        """
+        A user and every user with role_id, from one
+        SELECT ... WHERE UserId = ? OR RoleID = ?
+
+        Returns:
+            (user or None, users with role_id)
+        """
+        models = self.session.query(UserModel).filter(
+            or_(UserModel.UserId == user_id, UserModel.RoleID == role_id)
+        ).all()
+        submitter = None
+        role_users = []
+        for model in models:
+            user = self._to_domain(model)
+            if model.UserId == user_id:
+                submitter = user
+            if model.RoleID == role_id:
+                role_users.append(user)
+        return submitter, role_users
+
     def delete(self, user_id: int) -> None:
         import logging
         logger = logging.getLogger(__name__)
@@ -0,0 +1,60 @@
+"""
+Support notification outbox worker
+Polls the outbox table and emails admins about new support tickets.
+Run alongside the API when SUPPORT_NOTIFICATION_OUTBOX=true:
+
+    python -m scripts.support_outbox_worker
+"""
+
+import logging
+import os
+import sys
+import time
+from infrastructure.databases.mssql import session
+from infrastructure.repositories.support_repository import SupportRepository
+from infrastructure.repositories.user_repository import UserRepository
+from infrastructure.repositories.outbox_repository import OutboxRepository
+from services.email_service import get_email_service
+from services.support_service import SupportService
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """
+    Main function for standalone execution
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    poll_seconds = float(os.getenv('SUPPORT_OUTBOX_POLL_SECONDS', '5'))
+    batch_size = int(os.getenv('SUPPORT_OUTBOX_BATCH_SIZE', '100'))
+
+    email_service = get_email_service()
+    support_service = SupportService(SupportRepository(session), UserRepository(session),
+                                     email_service, OutboxRepository(session))
+
+    logger.info(f"Support outbox worker started (poll every {poll_seconds}s)")
+    try:
+        while True:
+            try:
+                sent = support_service.process_notification_outbox(batch_size)
+                if sent:
+                    logger.info(f"Sent admin notifications for {sent} support ticket(s)")
+                # A full batch means more may be waiting - poll again right away
+                if sent >= batch_size:
+                    continue
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Outbox worker error: {e}")
+            time.sleep(poll_seconds)
+    except KeyboardInterrupt:
+        logger.info("Support outbox worker stopped")
+    finally:
+        email_service.close()
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+_USER_STATUS_CHOICES = ('active', 'inactive', 'suspended')
+_VALID_USER_STATUSES = frozenset(_USER_STATUS_CHOICES)
+
 
 class AdminService:
     """
@@ -166,9 +169,8 @@ class AdminService:
         Raises:
             ValueError: If operation fails or invalid status
         """
-        valid_statuses = ['active', 'inactive', 'suspended']
-        if new_status not in valid_statuses:
-            raise ValueError(f"Invalid status. Must be one of: {', '.join(valid_statuses)}")
+        if new_status not in _VALID_USER_STATUSES:
+            raise ValueError(f"Invalid status. Must be one of: {', '.join(_USER_STATUS_CHOICES)}")
         
         try:
             # Get admin user for logging
@@ -1,13 +1,14 @@
 from typing import Optional, Dict, Any
 from domain.models.user import User
 from domain.models.iuser_repository import IUserRepository
-from services.email_service import EmailService
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import create_access_token, create_refresh_token
-from utils.jwt_helpers import create_jwt_identity
+from services.email_service import EmailService, get_email_service
+from cachetools import TTLCache
+from utils.jwt_helpers import create_jwt_identity, create_jwt_claims
 from datetime import datetime, timedelta
-import random
-import string
+import hashlib
+import hmac
+import secrets
+import threading
 import logging
 
 # Custom exceptions for better error handling
@@ -25,15 +26,110 @@ class UserAlreadyVerifiedError(ValueError):
 
 logger = logging.getLogger(__name__)
 
+# werkzeug.security and flask_jwt_extended pull in the KDF/JWT crypto backends,
+# so they are imported on first use instead of at module load
+_password_funcs_cache = None
+_signing_funcs_cache = None
+
+
+def _password_funcs():
+    """Return (generate_password_hash, check_password_hash), importing on first use"""
+    global _password_funcs_cache
+    if _password_funcs_cache is None:
+        from werkzeug.security import generate_password_hash, check_password_hash
+        _password_funcs_cache = (generate_password_hash, check_password_hash)
+    return _password_funcs_cache
+
+
+def _signing_funcs():
+    """Return (create_access_token, create_refresh_token), importing on first use"""
+    global _signing_funcs_cache
+    if _signing_funcs_cache is None:
+        from flask_jwt_extended import create_access_token, create_refresh_token
+        _signing_funcs_cache = (create_access_token, create_refresh_token)
+    return _signing_funcs_cache
+
+
+# Token lifetimes
+ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
+REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+
+def _new_access_token(user_id: int, role_id: int, username: str) -> str:
+    """Sign a fresh access token; the user ID is the identity, role and username are claims"""
+    create_access_token = _signing_funcs()[0]
+    return create_access_token(
+        identity=create_jwt_identity(user_id),
+        additional_claims=create_jwt_claims(role_id, username),
+        expires_delta=ACCESS_TOKEN_EXPIRES
+    )
+
+
+def _new_refresh_token(user_id: int, role_id: int, username: str) -> str:
+    """Sign a fresh refresh token"""
+    create_refresh_token = _signing_funcs()[1]
+    return create_refresh_token(
+        identity=create_jwt_identity(user_id),
+        additional_claims=create_jwt_claims(role_id, username),
+        expires_delta=REFRESH_TOKEN_EXPIRES
+    )
+
+
+# Password verification results keyed by (password_hash, HMAC(password)).
+# The HMAC secret is random per process and never leaves memory, so cache
+# keys can't be brute-forced offline like a plain digest of the password.
+# Successful checks are kept for 5 minutes, failures only briefly so repeated
+# wrong guesses still pay for the KDF
+_password_cache_secret = secrets.token_bytes(32)
+_password_ok_cache = TTLCache(maxsize=4096, ttl=300)
+_password_fail_cache = TTLCache(maxsize=4096, ttl=5)
+_password_cache_lock = threading.Lock()
+
+
+def _verify_password(password_hash: str, password: str) -> bool:
+    """check_password_hash with a short-lived cache to skip repeated KDF work"""
+    key = (password_hash, hmac.new(_password_cache_secret, password.encode(), hashlib.sha256).digest())
+    with _password_cache_lock:
+        if key in _password_ok_cache:
+            return True
+        if key in _password_fail_cache:
+            return False
+
+    check_password_hash = _password_funcs()[1]
+    result = check_password_hash(password_hash, password)
+    with _password_cache_lock:
+        if result:
+            _password_ok_cache[key] = True
+        else:
+            _password_fail_cache[key] = False
+    return result
+
+
+# Hash checked when the email is unknown, so "no such user" costs the same KDF
+# work as "wrong password" and login timing doesn't reveal registered emails
+_dummy_hash_cache = None
+
+
+def _dummy_password_hash() -> str:
+    global _dummy_hash_cache
+    if _dummy_hash_cache is None:
+        generate_password_hash = _password_funcs()[0]
+        _dummy_hash_cache = generate_password_hash(secrets.token_urlsafe(16))
+    return _dummy_hash_cache
+
+
 class AuthService:
     """
     Authentication Service - Handles all authentication-related operations
     Including user registration, verification, login, and password management
     """
+
+    # Cached default user role ID, populated on first successful lookup
+    _default_role_id_cache: Optional[int] = None
+    _default_role_id_lock = threading.Lock()
     
     def __init__(self, user_repository: IUserRepository, email_service: Optional[EmailService] = None):
         self.user_repository = user_repository
-        self.email_service = email_service or EmailService()
+        self.email_service = email_service or get_email_service()
     
     def register_user(self, username: str, email: str, password: str,
                      phone_number: str, date_of_birth, **kwargs) -> Dict[str, Any]:
@@ -55,11 +151,11 @@ class AuthService:
             ValueError: If user already exists or validation fails
         """
         # Check if user already exists
-        existing_user = self.user_repository.get_by_email(email)
-        if existing_user:
+        if self.user_repository.exists_by_email(email):
             raise ValueError("User with this email already exists")
         
         # Hash password
+        generate_password_hash = _password_funcs()[0]
         password_hash = generate_password_hash(password)
         
         # Generate verification code
@@ -88,19 +184,14 @@ class AuthService:
         # Save user to database
         created_user = self.user_repository.add(user)
         
-        # Send verification email
-        email_sent = self.email_service.send_verification_email(
-            to_email=email,
-            username=username,
-            verification_code=verification_code
-        )
-        
-        if not email_sent:
-            logger.warning(f"Failed to send verification email to {email}")
+        # Queue the verification email - don't hold the response on SMTP
+        self._queue_verification_email(email, username, verification_code)
 
         # Generate temporary JWT token for verification process
+        create_access_token = _signing_funcs()[0]
         temp_token = create_access_token(
-            identity=create_jwt_identity(created_user.id, created_user.role_id, created_user.username),
+            identity=create_jwt_identity(created_user.id),
+            additional_claims=create_jwt_claims(created_user.role_id, created_user.username),
             expires_delta=timedelta(minutes=10)  # Short-lived token for verification
         )
 
@@ -156,22 +247,15 @@ class AuthService:
             raise VerificationCodeInvalidError("Invalid verification code")
         
         # Update user as verified and clear verification data
+        self.user_repository.mark_verified(user.id)
         user.verified = True
         user.verification_code = None
         user.verification_expires_at = None
-        
-        updated_user = self.user_repository.update(user)
+        updated_user = user
         
         # Generate full access tokens with role information
-        jwt_identity = create_jwt_identity(updated_user.id, updated_user.role_id, updated_user.username)
-        access_token = create_access_token(
-            identity=jwt_identity,
-            expires_delta=timedelta(hours=24)
-        )
-        refresh_token = create_refresh_token(
-            identity=jwt_identity,
-            expires_delta=timedelta(days=30)
-        )
+        access_token = _new_access_token(updated_user.id, updated_user.role_id, updated_user.username)
+        refresh_token = _new_refresh_token(updated_user.id, updated_user.role_id, updated_user.username)
         
         return {
             'user': updated_user,
@@ -206,23 +290,10 @@ class AuthService:
         verification_expires_at = datetime.utcnow() + timedelta(minutes=5)
         
         # Update user with new verification code
-        user.verification_code = verification_code
-        user.verification_expires_at = verification_expires_at
-        
-        self.user_repository.update(user)
+        self.user_repository.update_verification(user.id, verification_code, verification_expires_at)
         
-        # Send new verification email
-        email_sent = self.email_service.send_verification_email(
-            to_email=user.email,
-            username=user.username,
-            verification_code=verification_code
-        )
-
-        if not email_sent:
-            logger.warning(f"Failed to resend verification email to {user.email}")
-            # In debug mode, don't fail - just log the issue
-            if not self.email_service.debug_mode:
-                raise ValueError("Failed to send verification email")
+        # Queue the new verification email; failures are logged
+        self._queue_verification_email(user.email, user.username, verification_code)
 
         message = 'Verification code resent successfully'
         if self.email_service.debug_mode:
@@ -250,9 +321,10 @@ class AuthService:
         user = self.user_repository.get_by_email(email)
         
         if not user:
+            _verify_password(_dummy_password_hash(), password)
             raise ValueError("Invalid email or password")
         
-        if not check_password_hash(user.password_hash, password):
+        if not _verify_password(user.password_hash, password):
             raise ValueError("Invalid email or password")
         
         if user.status != 'active':
@@ -264,15 +336,8 @@ class AuthService:
             raise ValueError("ACCOUNT_NOT_VERIFIED")
         
         # Generate tokens with role information
-        jwt_identity = create_jwt_identity(user.id, user.role_id, user.username)
-        access_token = create_access_token(
-            identity=jwt_identity,
-            expires_delta=timedelta(hours=24)
-        )
-        refresh_token = create_refresh_token(
-            identity=jwt_identity,
-            expires_delta=timedelta(days=30)
-        )
+        access_token = _new_access_token(user.id, user.role_id, user.username)
+        refresh_token = _new_refresh_token(user.id, user.role_id, user.username)
         
         return {
             'user': user,
@@ -300,11 +365,7 @@ class AuthService:
             raise ValueError("Invalid user or inactive account")
         
         # Create new access token with role information
-        jwt_identity = create_jwt_identity(user.id, user.role_id, user.username)
-        access_token = create_access_token(
-            identity=jwt_identity,
-            expires_delta=timedelta(hours=24)
-        )
+        access_token = _new_access_token(user.id, user.role_id, user.username)
         
         return {
             'access_token': access_token,
@@ -330,15 +391,36 @@ class AuthService:
         if not user:
             raise ValueError("User not found")
         
-        if not check_password_hash(user.password_hash, old_password):
+        if not _verify_password(user.password_hash, old_password):
             raise ValueError("Current password is incorrect")
         
         # Update password
-        user.password_hash = generate_password_hash(new_password)
-        self.user_repository.update(user)
+        generate_password_hash = _password_funcs()[0]
+        self.user_repository.update_password_hash(user.id, generate_password_hash(new_password))
         
         return True
     
+    def _queue_verification_email(self, to_email: str, username: str, verification_code: str) -> bool:
+        """
+        Hand the verification email to the EmailService outbox (sent by its
+        background worker, so SMTP latency stays off the request path)
+
+        Returns:
+            bool: True if the email was queued
+        """
+        try:
+            queued = self.email_service.send_verification_email(
+                to_email=to_email,
+                username=username,
+                verification_code=verification_code
+            )
+        except Exception as e:
+            logger.error(f"Error sending verification email to {to_email}: {e}")
+            return False
+        if not queued:
+            logger.warning(f"Failed to send verification email to {to_email}")
+        return queued
+
     def _get_default_user_role_id(self) -> int:
         """
         Get default user role ID (fixed ID = 2)
@@ -349,14 +431,23 @@ class AuthService:
         Raises:
             ValueError: If User role doesn't exist in database
         """
+        # The role ID is fixed for the life of the process: only the first call queries the DB
+        if AuthService._default_role_id_cache is not None:
+            return AuthService._default_role_id_cache
+
         try:
             from infrastructure.models.role_model import RoleModel
             from infrastructure.databases.mssql import session
 
-            # Check if User role (ID=2) exists
-            user_role = session.query(RoleModel).filter(RoleModel.RoleID == 2).first()
-            if user_role:
-                return 2
+            with AuthService._default_role_id_lock:
+                if AuthService._default_role_id_cache is not None:
+                    return AuthService._default_role_id_cache
+
+                # Check if User role (ID=2) exists
+                user_role = session.query(RoleModel).filter(RoleModel.RoleID == 2).first()
+                if user_role:
+                    AuthService._default_role_id_cache = 2
+                    return 2
 
             # If role doesn't exist, raise error with helpful message
             raise ValueError(
@@ -378,4 +469,4 @@ class AuthService:
         Returns:
             str: 6-digit verification code
         """
-        return ''.join(random.choices(string.digits, k=6))
+        return f"{secrets.randbelow(1_000_000):06d}"
@@ -1,21 +1,43 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from domain.models.earning import Earning
 from domain.models.iearning_repository import IEarningRepository
 from domain.models.iuser_repository import IUserRepository
 from datetime import datetime, timedelta
+from flask import g, has_request_context
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Default platform commission rate (5%)
+DEFAULT_PLATFORM_COMMISSION = 0.05
+
+
+def _compute_seller_net(transaction_amount: float, platform_commission: float = DEFAULT_PLATFORM_COMMISSION) -> float:
+    """Seller's share of a transaction after platform commission"""
+    return transaction_amount * (1.0 - platform_commission)
+
+
 class EarningService:
     def __init__(self, earning_repository: IEarningRepository, user_repository: IUserRepository):
         self.earning_repository = earning_repository
         self.user_repository = user_repository
+
+    def _user_exists(self, user_id: int) -> bool:
+        """
+        Check that a user exists, memoized for the current request so chained
+        service calls only hit the database once per user
+        """
+        if not has_request_context():
+            return self.user_repository.get_by_id(user_id) is not None
+
+        cache = g.setdefault('_user_exists_cache', {})
+        if user_id not in cache:
+            cache[user_id] = self.user_repository.get_by_id(user_id) is not None
+        return cache[user_id]
     
     def create_earning(self, user_id: int, total_amount: float) -> Earning:
         # Validate user exists
-        user = self.user_repository.get_by_id(user_id)
-        if not user:
+        if not self._user_exists(user_id):
             raise ValueError("User not found")
         
         # Create earning record
@@ -33,24 +55,21 @@ class EarningService:
     
     def get_user_earnings(self, user_id: int) -> List[Earning]:
         # Validate user exists
-        user = self.user_repository.get_by_id(user_id)
-        if not user:
+        if not self._user_exists(user_id):
             raise ValueError("User not found")
         
         return self.earning_repository.get_by_user_id(user_id)
     
     def get_total_user_earnings(self, user_id: int) -> float:
         # Validate user exists
-        user = self.user_repository.get_by_id(user_id)
-        if not user:
+        if not self._user_exists(user_id):
             raise ValueError("User not found")
         
         return self.earning_repository.get_total_earnings_by_user(user_id)
     
     def get_earnings_by_date_range(self, user_id: int, start_date, end_date) -> List[Earning]:
         # Validate user exists
-        user = self.user_repository.get_by_id(user_id)
-        if not user:
+        if not self._user_exists(user_id):
             raise ValueError("User not found")
         
         return self.earning_repository.get_earnings_by_date_range(user_id, start_date, end_date)
@@ -77,7 +96,9 @@ class EarningService:
         earning_amount = transaction_amount * commission_rate
         return self.create_earning(user_id, earning_amount)
 
-    def calculate_seller_earnings(self, user_id: int, transaction_amount: float, platform_commission: float = 0.05) -> Dict[str, float]:
+    def calculate_seller_earnings(self, user_id: int, transaction_amount: float,
+                                  platform_commission: float = DEFAULT_PLATFORM_COMMISSION,
+                                  _skip_validation: bool = False) -> Dict[str, float]:
         """
         Calculate seller earnings after platform commission
 
@@ -85,16 +106,16 @@ class EarningService:
             user_id: Seller user ID
             transaction_amount: Total transaction amount
             platform_commission: Platform commission rate (default 5%)
+            _skip_validation: Skip the user existence check when the caller already did it
 
         Returns:
             Dict with earnings breakdown
         """
-        user = self.user_repository.get_by_id(user_id)
-        if not user:
+        if not _skip_validation and not self._user_exists(user_id):
             raise ValueError("User not found")
 
-        commission_amount = transaction_amount * platform_commission
-        seller_earnings = transaction_amount - commission_amount
+        seller_earnings = _compute_seller_net(transaction_amount, platform_commission)
+        commission_amount = transaction_amount - seller_earnings
 
         return {
             'transaction_amount': transaction_amount,
@@ -116,22 +137,63 @@ class EarningService:
         Returns:
             Created earning record
         """
-        earnings_breakdown = self.calculate_seller_earnings(seller_id, transaction_amount)
+        if not self._user_exists(seller_id):
+            raise ValueError("User not found")
+
+        seller_earnings = _compute_seller_net(transaction_amount)
 
         # Create earning record for seller
         earning = Earning(
             EarningID=None,
             UserID=seller_id,
-            TotalAmount=earnings_breakdown['seller_earnings'],
+            TotalAmount=seller_earnings,
             Date=datetime.now()
         )
 
         created_earning = self.earning_repository.add(earning)
 
-        logger.info(f"Processed earnings for seller {seller_id}: ${earnings_breakdown['seller_earnings']:.2f} from transaction ${transaction_amount:.2f}")
+        logger.info(f"Processed earnings for seller {seller_id}: ${seller_earnings:.2f} from transaction ${transaction_amount:.2f}")
 
         return created_earning
 
+    def process_transaction_earnings_batch(self, items: List[Tuple[int, float]]) -> List[Earning]:
+        """
+        Process earnings for many (seller_id, transaction_amount) pairs at once
+
+        Sellers are validated with one batched lookup and all earnings are
+        inserted together, instead of one lookup and one insert per item.
+
+        Args:
+            items: List of (seller_id, transaction_amount)
+
+        Returns:
+            Created earning records, in the same order as items
+        """
+        if not items:
+            return []
+
+        seller_ids = {seller_id for seller_id, _ in items}
+        users = self.user_repository.get_by_ids(list(seller_ids))
+        missing = seller_ids - users.keys()
+        if missing:
+            raise ValueError(f"User not found: {sorted(missing)}")
+
+        now = datetime.now()
+        earnings = []
+        for seller_id, transaction_amount in items:
+            earnings.append(Earning(
+                EarningID=None,
+                UserID=seller_id,
+                TotalAmount=_compute_seller_net(transaction_amount),
+                Date=now
+            ))
+
+        created_earnings = self.earning_repository.add_many(earnings)
+
+        logger.info(f"Processed earnings for {len(created_earnings)} transactions across {len(seller_ids)} sellers")
+
+        return created_earnings
+
     def get_earnings_statistics(self, user_id: int) -> Dict[str, Any]:
         """
         Get comprehensive earnings statistics for a user
@@ -142,14 +204,24 @@ class EarningService:
         Returns:
             Dict with earnings statistics
         """
-        user = self.user_repository.get_by_id(user_id)
-        if not user:
+        if not self._user_exists(user_id):
             raise ValueError("User not found")
 
-        # Get all earnings
-        all_earnings = self.earning_repository.get_by_user_id(user_id)
+        # Calculate trend windows (last 30 days vs previous 30 days)
+        now = datetime.now()
+        twelve_months_ago = now - timedelta(days=365)
+        thirty_days_ago = now - timedelta(days=30)
+        sixty_days_ago = now - timedelta(days=60)
+
+        # All aggregates come back from the database in a single round-trip
+        bundle = self.earning_repository.get_statistics_bundle(
+            user_id, twelve_months_ago, thirty_days_ago, sixty_days_ago, 10
+        )
+        total_earnings = bundle['total']
+        total_transactions = bundle['count']
+        average_earning = bundle['average']
 
-        if not all_earnings:
+        if not total_transactions:
             return {
                 'user_id': user_id,
                 'total_earnings': 0.0,
@@ -160,49 +232,35 @@ class EarningService:
                 'earnings_trend': 'neutral'
             }
 
-        # Calculate basic statistics
-        total_earnings = sum(e.TotalAmount for e in all_earnings)
-        total_transactions = len(all_earnings)
-        average_earning = total_earnings / total_transactions
-
         # Monthly breakdown (last 12 months)
-        monthly_earnings = {}
-        twelve_months_ago = datetime.now() - timedelta(days=365)
-
-        for earning in all_earnings:
-            if earning.Date >= twelve_months_ago:
-                month_key = earning.Date.strftime('%Y-%m')
-                if month_key not in monthly_earnings:
-                    monthly_earnings[month_key] = {'amount': 0.0, 'count': 0}
-                monthly_earnings[month_key]['amount'] += earning.TotalAmount
-                monthly_earnings[month_key]['count'] += 1
+        # GROUP BY already yields one row per month, so buckets are built directly
+        monthly_earnings = {
+            f"{year:04d}-{month:02d}": {'amount': amount, 'count': count}
+            for year, month, amount, count in bundle['monthly']
+        }
 
         # Recent earnings (last 10)
-        recent_earnings = sorted(all_earnings, key=lambda x: x.Date, reverse=True)[:10]
         recent_earnings_data = []
-        for earning in recent_earnings:
+        for earning in bundle['recent']:
             recent_earnings_data.append({
                 'earning_id': earning.EarningID,
                 'amount': earning.TotalAmount,
                 'date': earning.Date.isoformat()
             })
 
-        # Calculate trend (last 30 days vs previous 30 days)
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        sixty_days_ago = datetime.now() - timedelta(days=60)
-
-        recent_earnings_amount = sum(e.TotalAmount for e in all_earnings if e.Date >= thirty_days_ago)
-        previous_earnings_amount = sum(e.TotalAmount for e in all_earnings if sixty_days_ago <= e.Date < thirty_days_ago)
+        recent_earnings_amount = bundle['recent_period']
+        previous_earnings_amount = bundle['previous_period']
 
         trend = 'neutral'
         if previous_earnings_amount > 0:
             change_percentage = ((recent_earnings_amount - previous_earnings_amount) / previous_earnings_amount) * 100
         else:
             change_percentage = 0
-            if change_percentage > 10:
-                trend = 'increasing'
-            elif change_percentage < -10:
-                trend = 'decreasing'
+
+        if change_percentage > 10:
+            trend = 'increasing'
+        elif change_percentage < -10:
+            trend = 'decreasing'
 
         return {
             'user_id': user_id,
@@ -227,8 +285,7 @@ class EarningService:
         Returns:
             Dict with earnings summary
         """
-        user = self.user_repository.get_by_id(user_id)
-        if not user:
+        if not self._user_exists(user_id):
             raise ValueError("User not found")
 
         # Calculate date range based on period
@@ -242,13 +299,15 @@ class EarningService:
         else:  # 'all'
             start_date = datetime.min
 
-        # Get earnings for the period
-        if period == 'all':
-            earnings = self.earning_repository.get_by_user_id(user_id)
-        else:
-            earnings = self.earning_repository.get_earnings_by_date_range(user_id, start_date, end_date)
+        # Aggregate the period in SQL instead of loading every row
+        total_amount, transaction_count, average_amount, highest_earning, lowest_earning = \
+            self.earning_repository.get_summary(
+                user_id,
+                None if period == 'all' else start_date,
+                None if period == 'all' else end_date
+            )
 
-        if not earnings:
+        if not transaction_count:
             return {
                 'user_id': user_id,
                 'period': period,
@@ -259,16 +318,14 @@ class EarningService:
                 'lowest_earning': 0.0
             }
 
-        amounts = [e.TotalAmount for e in earnings]
-
         return {
             'user_id': user_id,
             'period': period,
-            'total_amount': round(sum(amounts), 2),
-            'transaction_count': len(earnings),
-            'average_amount': round(sum(amounts) / len(amounts), 2),
-            'highest_earning': round(max(amounts), 2),
-            'lowest_earning': round(min(amounts), 2),
+            'total_amount': round(total_amount, 2),
+            'transaction_count': transaction_count,
+            'average_amount': round(average_amount, 2),
+            'highest_earning': round(highest_earning, 2),
+            'lowest_earning': round(lowest_earning, 2),
             'start_date': start_date.isoformat() if start_date != datetime.min else None,
             'end_date': end_date.isoformat()
         }
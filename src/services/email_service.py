@@ -1,90 +1,90 @@
 import smtplib
 import os
+import atexit
+import queue
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional
+from typing import Optional, List, Tuple
+import asyncio
 import logging
+from jinja2 import Environment, DictLoader, select_autoescape
+import aiosmtplib
 
 logger = logging.getLogger(__name__)
 
-class EmailService:
-    """
-    Email Service for sending verification emails
-    Supports both SMTP and SendGrid (can be extended)
-    """
-    
-    def __init__(self):
-        # Email configuration from environment variables
-        self.smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-        self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
-        self.smtp_username = os.getenv('SMTP_USERNAME', '')
-        self.smtp_password = os.getenv('SMTP_PASSWORD', '')
-        self.from_email = os.getenv('FROM_EMAIL', 'noreply@ticketresell.com')
-        self.from_name = os.getenv('FROM_NAME', 'TicketResell')
-        
-        # For development/testing - set to True to skip actual email sending
-        # Default to True for development unless explicitly configured
-        self.debug_mode = os.getenv('EMAIL_DEBUG_MODE', 'True').lower() == 'true'
-
-        # Check if SMTP is properly configured
-        self.smtp_configured = bool(self.smtp_username and self.smtp_password)
 
-        # Auto-enable debug mode if SMTP not configured
-        if not self.smtp_configured:
-            self.debug_mode = True
-            logger.info("SMTP not configured - enabling debug mode")
-    
-    def send_verification_email(self, to_email: str, username: str, verification_code: str) -> bool:
+# Static HTML footer and text signature shared by every email. They are
+# spliced into the template sources once at import, so the per-send render
+# only has to fill in the dynamic fields.
+_HTML_FOOTER = """                    <p>Best regards,<br>The TicketResell Team</p>
+                </div>
+                <div class="footer">
+                    <p>This is an automated message. Please do not reply to this email.</p>
+                    <p>&copy; 2024 TicketResell. All rights reserved.</p>
+                </div>
+            </div>
+        </body>
+        </html>
         """
-        Send verification email with 6-digit code
-        
-        Args:
-            to_email: Recipient email address
-            username: User's username for personalization
-            verification_code: 6-digit verification code
-            
-        Returns:
-            bool: True if email sent successfully, False otherwise
+
+_TEXT_SIGNATURE = """
+        Best regards,
+        The TicketResell Team
         """
-        subject = "Verify Your TicketResell Account"
-        
-        # HTML email template
-        html_body = f"""
+
+# Stylesheet shared by every HTML email; each template only adds its accent
+# color and its own component rules on top.
+_BASE_CSS = """
+                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+                .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+                .content { padding: 30px; background-color: #f9f9f9; }
+                .footer { padding: 20px; text-align: center; color: #666; font-size: 12px; }
+                .warning { color: #dc3545; font-weight: bold; }"""
+
+_ACCENT_VERIFY = "#007bff"
+_ACCENT_RESET = "#dc3545"
+
+
+def _html_head(title: str, accent: str, extra_css: str) -> str:
+    """Document head with the shared stylesheet, accent header and extra rules"""
+    return """
         <!DOCTYPE html>
         <html>
         <head>
             <meta charset="UTF-8">
-            <title>Verify Your Account</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background-color: #007bff; color: white; padding: 20px; text-align: center; }}
-                .content {{ padding: 30px; background-color: #f9f9f9; }}
-                .verification-code {{ 
+            <title>""" + title + """</title>
+            <style>""" + _BASE_CSS + """
+                .header { background-color: """ + accent + """; color: white; padding: 20px; text-align: center; }""" + extra_css + """            </style>
+        </head>
+"""
+
+
+# Email templates, compiled once by Jinja2 and cached by the environment.
+# HTML templates are autoescaped; plain-text templates are not.
+_EMAIL_TEMPLATES = {
+    'verification.html': _html_head("Verify Your Account", _ACCENT_VERIFY, """
+                .verification-code { 
                     font-size: 32px; 
                     font-weight: bold; 
-                    color: #007bff; 
+                    color: """ + _ACCENT_VERIFY + """; 
                     text-align: center; 
                     padding: 20px; 
                     background-color: white; 
-                    border: 2px dashed #007bff; 
+                    border: 2px dashed """ + _ACCENT_VERIFY + """; 
                     margin: 20px 0; 
-                }}
-                .footer {{ padding: 20px; text-align: center; color: #666; font-size: 12px; }}
-                .warning {{ color: #dc3545; font-weight: bold; }}
-            </style>
-        </head>
-        <body>
+                }
+""") + """        <body>
             <div class="container">
                 <div class="header">
                     <h1>Welcome to TicketResell!</h1>
                 </div>
                 <div class="content">
-                    <h2>Hi {username},</h2>
+                    <h2>Hi {{ username }},</h2>
                     <p>Thank you for registering with TicketResell! To complete your account setup, please verify your email address using the code below:</p>
                     
                     <div class="verification-code">
-                        {verification_code}
+                        {{ verification_code }}
                     </div>
                     
                     <p>Enter this code in the verification page to activate your account.</p>
@@ -93,125 +93,245 @@ class EmailService:
                     
                     <p>If you didn't create an account with TicketResell, please ignore this email.</p>
                     
-                    <p>Best regards,<br>The TicketResell Team</p>
-                </div>
-                <div class="footer">
-                    <p>This is an automated message. Please do not reply to this email.</p>
-                    <p>&copy; 2024 TicketResell. All rights reserved.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Plain text version for email clients that don't support HTML
-        text_body = f"""
-        Hi {username},
+""" + _HTML_FOOTER,
+    'verification.txt': """
+        Hi {{ username }},
 
         Thank you for registering with TicketResell!
 
-        Your verification code is: {verification_code}
+        Your verification code is: {{ verification_code }}
 
         Please enter this code in the verification page to activate your account.
         This code will expire in 5 minutes.
 
         If you didn't create an account with TicketResell, please ignore this email.
-
-        Best regards,
-        The TicketResell Team
-        """
-        
-        return self._send_email(to_email, subject, text_body, html_body)
-    
-    def send_password_reset_email(self, to_email: str, username: str, reset_token: str) -> bool:
-        """
-        Send password reset email with reset link
-        
-        Args:
-            to_email: Recipient email address
-            username: User's username
-            reset_token: Password reset token
-            
-        Returns:
-            bool: True if email sent successfully, False otherwise
-        """
-        subject = "Reset Your TicketResell Password"
-        
-        # In production, this should be your frontend URL
-        reset_url = f"https://ticketresell.com/reset-password?token={reset_token}"
-        
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <title>Reset Your Password</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background-color: #dc3545; color: white; padding: 20px; text-align: center; }}
-                .content {{ padding: 30px; background-color: #f9f9f9; }}
-                .button {{ 
+""" + _TEXT_SIGNATURE,
+    'reset.html': _html_head("Reset Your Password", _ACCENT_RESET, """
+                .button { 
                     display: inline-block; 
                     padding: 12px 24px; 
-                    background-color: #dc3545; 
+                    background-color: """ + _ACCENT_RESET + """; 
                     color: white; 
                     text-decoration: none; 
                     border-radius: 5px; 
                     margin: 20px 0; 
-                }}
-                .footer {{ padding: 20px; text-align: center; color: #666; font-size: 12px; }}
-                .warning {{ color: #dc3545; font-weight: bold; }}
-            </style>
-        </head>
-        <body>
+                }
+""") + """        <body>
             <div class="container">
                 <div class="header">
                     <h1>Password Reset Request</h1>
                 </div>
                 <div class="content">
-                    <h2>Hi {username},</h2>
+                    <h2>Hi {{ username }},</h2>
                     <p>We received a request to reset your TicketResell account password.</p>
                     
                     <p>Click the button below to reset your password:</p>
-                    <a href="{reset_url}" class="button">Reset Password</a>
+                    <a href="{{ reset_url }}" class="button">Reset Password</a>
                     
                     <p>Or copy and paste this link into your browser:</p>
-                    <p>{reset_url}</p>
+                    <p>{{ reset_url }}</p>
                     
                     <p class="warning">This link will expire in 15 minutes for security reasons.</p>
                     
                     <p>If you didn't request a password reset, please ignore this email. Your password will remain unchanged.</p>
                     
-                    <p>Best regards,<br>The TicketResell Team</p>
-                </div>
-                <div class="footer">
-                    <p>This is an automated message. Please do not reply to this email.</p>
-                    <p>&copy; 2024 TicketResell. All rights reserved.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        text_body = f"""
-        Hi {username},
+""" + _HTML_FOOTER,
+    'reset.txt': """
+        Hi {{ username }},
 
         We received a request to reset your TicketResell account password.
 
         Please click the following link to reset your password:
-        {reset_url}
+        {{ reset_url }}
 
         This link will expire in 15 minutes.
 
         If you didn't request a password reset, please ignore this email.
+""" + _TEXT_SIGNATURE,
+}
 
-        Best regards,
-        The TicketResell Team
+_template_env = Environment(
+    loader=DictLoader(_EMAIL_TEMPLATES),
+    autoescape=select_autoescape(enabled_extensions=('html',), default_for_string=False),
+    keep_trailing_newline=True
+)
+
+
+class _PooledSMTP:
+    """Authenticated SMTP connection plus the number of messages sent on it"""
+    __slots__ = ('server', 'messages_sent')
+
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.messages_sent = 0
+
+
+class EmailService:
+    """
+    Email Service for sending verification emails
+    Supports both SMTP and SendGrid (can be extended)
+    """
+    
+    def __init__(self):
+        # Email configuration from environment variables
+        self.smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
+        self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
+        self.smtp_username = os.getenv('SMTP_USERNAME', '')
+        self.smtp_password = os.getenv('SMTP_PASSWORD', '')
+        self.from_email = os.getenv('FROM_EMAIL', 'noreply@ticketresell.com')
+        self.from_name = os.getenv('FROM_NAME', 'TicketResell')
+        
+        # For development/testing - set to True to skip actual email sending
+        # Default to True for development unless explicitly configured
+        self.debug_mode = os.getenv('EMAIL_DEBUG_MODE', 'True').lower() == 'true'
+
+        # Check if SMTP is properly configured
+        self.smtp_configured = bool(self.smtp_username and self.smtp_password)
+
+        # Auto-enable debug mode if SMTP not configured
+        if not self.smtp_configured:
+            self.debug_mode = True
+            logger.info("SMTP not configured - enabling debug mode")
+
+        # Pool of persistent SMTP connections, reused across sends to skip
+        # TCP + STARTTLS + AUTH. Slots start empty (None) and connect lazily;
+        # a connection is recycled after max_messages_per_connection sends.
+        self.pool_size = int(os.getenv('SMTP_POOL_SIZE', '5'))
+        self.max_messages_per_connection = int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', '100'))
+        self._pool: queue.Queue = queue.Queue(maxsize=self.pool_size)
+        for _ in range(self.pool_size):
+            self._pool.put(None)
+        atexit.register(self.close)
+
+        # From header is the same for every message, so format it once
+        self._from_header = f"{self.from_name} <{self.from_email}>"
+
+        # Outgoing queue drained by a background worker in batches through
+        # send_bulk, so request handlers don't wait on SMTP round-trips
+        self.send_batch_size = int(os.getenv('EMAIL_SEND_BATCH_SIZE', '64'))
+        self._outbox: queue.Queue = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+        # Async client kept between sends and (re)connected only when needed.
+        # It is bound to the event loop that opened it, as is its lock.
+        self._async_smtp: Optional[aiosmtplib.SMTP] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_lock: Optional[asyncio.Lock] = None
+        if not self.debug_mode:
+            self._worker = threading.Thread(target=self._drain_outbox, name='email-outbox', daemon=True)
+            self._worker.start()
+
+        # Compiled templates (Jinja caches the compiled code per environment)
+        self._tpl_verify_html = _template_env.get_template('verification.html')
+        self._tpl_verify_text = _template_env.get_template('verification.txt')
+        self._tpl_reset_html = _template_env.get_template('reset.html')
+        self._tpl_reset_text = _template_env.get_template('reset.txt')
+    
+    def send_verification_email(self, to_email: str, username: str, verification_code: str) -> bool:
+        """
+        Send verification email with 6-digit code
+        
+        Args:
+            to_email: Recipient email address
+            username: User's username for personalization
+            verification_code: 6-digit verification code
+            
+        Returns:
+            bool: True if email was queued (or logged in debug mode)
+        """
+        if self.debug_mode:
+            # Bodies would only be discarded after logging - skip rendering
+            self._log_debug_skipped(to_email, "Verify Your TicketResell Account",
+                                    f"Verification code: {verification_code}")
+            return True
+        subject, text_body, html_body = self._verification_content(username, verification_code)
+        return self.queue_email(to_email, subject, text_body, html_body)
+
+    async def send_verification_email_async(self, to_email: str, username: str, verification_code: str) -> bool:
+        """Async variant of send_verification_email (aiosmtplib)"""
+        if self.debug_mode:
+            self._log_debug_skipped(to_email, "Verify Your TicketResell Account",
+                                    f"Verification code: {verification_code}")
+            return True
+        subject, text_body, html_body = self._verification_content(username, verification_code)
+        return await self._send_email_async(to_email, subject, text_body, html_body)
+
+    def _verification_content(self, username: str, verification_code: str) -> Tuple[str, str, str]:
+        """Build (subject, text_body, html_body) for the verification email"""
+        subject = "Verify Your TicketResell Account"
+        context = {'username': username, 'verification_code': verification_code}
+        return subject, self._tpl_verify_text.render(context), self._tpl_verify_html.render(context)
+    
+    def send_password_reset_email(self, to_email: str, username: str, reset_token: str) -> bool:
+        """
+        Send password reset email with reset link
+        
+        Args:
+            to_email: Recipient email address
+            username: User's username
+            reset_token: Password reset token
+            
+        Returns:
+            bool: True if email was queued (or logged in debug mode)
         """
+        if self.debug_mode:
+            self._log_debug_skipped(to_email, "Reset Your TicketResell Password",
+                                    f"Reset token: {reset_token}")
+            return True
+        subject, text_body, html_body = self._password_reset_content(username, reset_token)
+        return self.queue_email(to_email, subject, text_body, html_body)
+
+    async def send_password_reset_email_async(self, to_email: str, username: str, reset_token: str) -> bool:
+        """Async variant of send_password_reset_email (aiosmtplib)"""
+        if self.debug_mode:
+            self._log_debug_skipped(to_email, "Reset Your TicketResell Password",
+                                    f"Reset token: {reset_token}")
+            return True
+        subject, text_body, html_body = self._password_reset_content(username, reset_token)
+        return await self._send_email_async(to_email, subject, text_body, html_body)
+
+    def _password_reset_content(self, username: str, reset_token: str) -> Tuple[str, str, str]:
+        """Build (subject, text_body, html_body) for the password reset email"""
+        subject = "Reset Your TicketResell Password"
+        
+        # In production, this should be your frontend URL
+        reset_url = f"https://ticketresell.com/reset-password?token={reset_token}"
         
-        return self._send_email(to_email, subject, text_body, html_body)
+        context = {'username': username, 'reset_url': reset_url}
+        return subject, self._tpl_reset_text.render(context), self._tpl_reset_html.render(context)
     
+    def _build_message(self, to_email: str, subject: str, text_body: str,
+                       html_body: Optional[str] = None) -> MIMEMultipart:
+        """Create the multipart/alternative message"""
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = self._from_header
+        msg['To'] = to_email
+        
+        # Add text part
+        text_part = MIMEText(text_body, 'plain')
+        msg.attach(text_part)
+        
+        # Add HTML part if provided
+        if html_body:
+            html_part = MIMEText(html_body, 'html')
+            msg.attach(html_part)
+        return msg
+
+    def _log_debug_email(self, to_email: str, subject: str, text_body: str, html_body: Optional[str]) -> None:
+        logger.info(f"[EMAIL DEBUG] Would send email to {to_email}")
+        logger.info(f"[EMAIL DEBUG] Subject: {subject}")
+        logger.info(f"[EMAIL DEBUG] Text Body: {text_body[:200]}...")
+        if html_body:
+            logger.info(f"[EMAIL DEBUG] HTML Body: {len(html_body)} characters")
+        logger.info("[EMAIL DEBUG] Email sending simulated successfully")
+
+    def _log_debug_skipped(self, to_email: str, subject: str, detail: str) -> None:
+        logger.info(f"[EMAIL DEBUG] Would send email to {to_email}")
+        logger.info(f"[EMAIL DEBUG] Subject: {subject}")
+        logger.info(f"[EMAIL DEBUG] {detail}")
+        logger.info("[EMAIL DEBUG] Email sending simulated successfully")
+
     def _send_email(self, to_email: str, subject: str, text_body: str, html_body: Optional[str] = None) -> bool:
         """
         Internal method to send email via SMTP
@@ -226,12 +346,7 @@ class EmailService:
             bool: True if sent successfully, False otherwise
         """
         if self.debug_mode:
-            logger.info(f"[EMAIL DEBUG] Would send email to {to_email}")
-            logger.info(f"[EMAIL DEBUG] Subject: {subject}")
-            logger.info(f"[EMAIL DEBUG] Text Body: {text_body[:200]}...")
-            if html_body:
-                logger.info(f"[EMAIL DEBUG] HTML Body: {len(html_body)} characters")
-            logger.info("[EMAIL DEBUG] Email sending simulated successfully")
+            self._log_debug_email(to_email, subject, text_body, html_body)
             return True
 
         # Log email configuration for debugging
@@ -244,29 +359,20 @@ class EmailService:
 
         try:
             # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = f"{self.from_name} <{self.from_email}>"
-            msg['To'] = to_email
-            
-            # Add text part
-            text_part = MIMEText(text_body, 'plain')
-            msg.attach(text_part)
+            msg = self._build_message(to_email, subject, text_body, html_body)
             
-            # Add HTML part if provided
-            if html_body:
-                html_part = MIMEText(html_body, 'html')
-                msg.attach(html_part)
-            
-            # Send email
-            logger.info(f"[EMAIL] Connecting to SMTP server...")
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                logger.info(f"[EMAIL] Starting TLS...")
-                server.starttls()
-                logger.info(f"[EMAIL] Logging in with username: {self.smtp_username}")
-                server.login(self.smtp_username, self.smtp_password)
+            # Send email over a pooled connection
+            conn = self._acquire_smtp()
+            try:
                 logger.info(f"[EMAIL] Sending message...")
-                server.send_message(msg)
+                conn.server.send_message(msg)
+                conn.messages_sent += 1
+            except smtplib.SMTPServerDisconnected:
+                self._quit_smtp(conn.server)
+                conn = None
+                raise
+            finally:
+                self._pool.put(conn)
 
             logger.info(f"[EMAIL] Email sent successfully to {to_email}")
             return True
@@ -286,6 +392,275 @@ class EmailService:
             logger.error(f"[EMAIL] Error type: {type(e).__name__}")
             return False
     
+    def queue_email(self, to_email: str, subject: str, text_body: str, html_body: Optional[str] = None) -> bool:
+        """
+        Queue an email for the background worker and return immediately
+
+        Returns:
+            bool: True once queued (delivery failures are logged by the worker)
+        """
+        if self.debug_mode or self._worker is None:
+            return self._send_email(to_email, subject, text_body, html_body)
+        self._outbox.put((to_email, subject, text_body, html_body))
+        return True
+
+    def _drain_outbox(self) -> None:
+        """Worker loop: wait for queued emails and flush them in batches via send_bulk"""
+        while True:
+            item = self._outbox.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.send_batch_size:
+                try:
+                    item = self._outbox.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                for to_email, sent in self.send_bulk(batch, self.send_batch_size):
+                    if not sent:
+                        logger.warning(f"[EMAIL] Failed to deliver queued email to {to_email}")
+            except Exception as e:
+                logger.error(f"[EMAIL] Outbox worker error: {str(e)}")
+            if stop:
+                return
+
+    def send_bulk(self, messages: List[Tuple[str, str, str, Optional[str]]],
+                  batch_size: int = 64) -> List[Tuple[str, bool]]:
+        """
+        Send many emails back-to-back over a single pooled SMTP connection
+
+        Messages are sent in batches of batch_size. If more than a third of a
+        batch of 30 or more fails, the remaining messages are not attempted
+        (the server is most likely rejecting us) and are reported as failed.
+
+        Args:
+            messages: List of (to_email, subject, text_body, html_body)
+            batch_size: Number of messages between failure-rate checks
+
+        Returns:
+            List of (to_email, success), in the same order as messages
+        """
+        if not messages:
+            return []
+
+        if self.debug_mode:
+            for to_email, subject, text_body, html_body in messages:
+                self._log_debug_email(to_email, subject, text_body, html_body)
+            return [(to_email, True) for to_email, *_ in messages]
+
+        results: List[Tuple[str, bool]] = []
+        try:
+            conn = self._acquire_smtp()
+        except Exception as e:
+            logger.error(f"[EMAIL] Bulk send could not connect: {str(e)}")
+            return [(to_email, False) for to_email, *_ in messages]
+
+        try:
+            for start in range(0, len(messages), batch_size):
+                batch = messages[start:start + batch_size]
+                failed = 0
+                for to_email, subject, text_body, html_body in batch:
+                    try:
+                        if conn is None:
+                            conn = _PooledSMTP(self._connect_smtp())
+                        conn.server.send_message(self._build_message(to_email, subject, text_body, html_body))
+                        conn.messages_sent += 1
+                        results.append((to_email, True))
+                    except (smtplib.SMTPServerDisconnected, OSError) as e:
+                        logger.error(f"[EMAIL] Connection lost sending to {to_email}: {str(e)}")
+                        if conn is not None:
+                            self._quit_smtp(conn.server)
+                        conn = None
+                        failed += 1
+                        results.append((to_email, False))
+                    except smtplib.SMTPException as e:
+                        logger.error(f"[EMAIL] Failed to send email to {to_email}: {str(e)}")
+                        failed += 1
+                        results.append((to_email, False))
+
+                if len(batch) >= 30 and failed * 3 > len(batch):
+                    logger.error(f"[EMAIL] Aborting bulk send: {failed}/{len(batch)} failed in last batch")
+                    results.extend((to_email, False) for to_email, *_ in messages[len(results):])
+                    break
+        finally:
+            self._pool.put(conn)
+
+        return results
+
+    async def _send_email_async(self, to_email: str, subject: str, text_body: str,
+                                html_body: Optional[str] = None) -> bool:
+        """
+        Send one email with aiosmtplib so the SMTP round-trips don't block the event loop
+
+        Returns:
+            bool: True if sent successfully, False otherwise
+        """
+        if self.debug_mode:
+            self._log_debug_email(to_email, subject, text_body, html_body)
+            return True
+
+        msg = self._build_message(to_email, subject, text_body, html_body)
+        async with self._async_client_lock():
+            # One retry on a fresh connection if the kept one was dropped
+            for attempt in range(2):
+                try:
+                    smtp = await self._get_async_smtp()
+                    await smtp.send_message(msg)
+                    logger.info(f"[EMAIL] Email sent successfully to {to_email}")
+                    return True
+                except aiosmtplib.SMTPServerDisconnected as e:
+                    self._async_smtp = None
+                    if attempt:
+                        logger.error(f"[EMAIL] SMTP server disconnected: {str(e)}")
+                        return False
+                except Exception as e:
+                    logger.error(f"[EMAIL] Failed to send email to {to_email}: {str(e)}")
+                    return False
+        return False
+
+    def _async_client_lock(self) -> asyncio.Lock:
+        """Lock guarding the kept async client, reset if the event loop changed"""
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            # The old client belongs to another (likely closed) loop
+            self._async_loop = loop
+            self._async_lock = asyncio.Lock()
+            self._async_smtp = None
+        return self._async_lock
+
+    async def _get_async_smtp(self) -> aiosmtplib.SMTP:
+        """Return the kept aiosmtplib client, connecting + STARTTLS + AUTH only when needed"""
+        smtp = self._async_smtp
+        if smtp is None or not smtp.is_connected:
+            smtp = aiosmtplib.SMTP(hostname=self.smtp_server, port=self.smtp_port, start_tls=True)
+            await smtp.connect()
+            await smtp.login(self.smtp_username, self.smtp_password)
+            self._async_smtp = smtp
+        return smtp
+
+    async def aclose(self) -> None:
+        """Close the kept async SMTP connection (call from the loop that used it)"""
+        smtp, self._async_smtp = self._async_smtp, None
+        if smtp is not None and smtp.is_connected:
+            try:
+                await smtp.quit()
+            except aiosmtplib.SMTPException:
+                smtp.close()
+
+    async def send_many_async(self, messages: List[Tuple[str, str, str, Optional[str]]]) -> List[bool]:
+        """
+        Send many emails concurrently over at most pool_size aiosmtplib connections
+
+        Args:
+            messages: List of (to_email, subject, text_body, html_body)
+
+        Returns:
+            List of send results, in the same order as messages
+        """
+        if not messages:
+            return []
+
+        if self.debug_mode:
+            for to_email, subject, text_body, html_body in messages:
+                self._log_debug_email(to_email, subject, text_body, html_body)
+            return [True] * len(messages)
+
+        pending: asyncio.Queue = asyncio.Queue()
+        for item in enumerate(messages):
+            pending.put_nowait(item)
+        results = [False] * len(messages)
+
+        async def worker() -> None:
+            try:
+                async with aiosmtplib.SMTP(hostname=self.smtp_server, port=self.smtp_port,
+                                           start_tls=True) as smtp:
+                    await smtp.login(self.smtp_username, self.smtp_password)
+                    while True:
+                        try:
+                            index, (to_email, subject, text_body, html_body) = pending.get_nowait()
+                        except asyncio.QueueEmpty:
+                            return
+                        try:
+                            await smtp.send_message(self._build_message(to_email, subject, text_body, html_body))
+                            results[index] = True
+                        except aiosmtplib.SMTPException as e:
+                            logger.error(f"[EMAIL] Failed to send email to {to_email}: {str(e)}")
+            except Exception as e:
+                logger.error(f"[EMAIL] Async SMTP worker failed: {str(e)}")
+
+        await asyncio.gather(*(worker() for _ in range(min(self.pool_size, len(messages)))))
+        return results
+
+    def _connect_smtp(self) -> smtplib.SMTP:
+        """Open a new authenticated SMTP connection"""
+        logger.info(f"[EMAIL] Connecting to SMTP server...")
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+        logger.info(f"[EMAIL] Starting TLS...")
+        server.starttls()
+        logger.info(f"[EMAIL] Logging in with username: {self.smtp_username}")
+        server.login(self.smtp_username, self.smtp_password)
+        return server
+
+    def _acquire_smtp(self) -> _PooledSMTP:
+        """
+        Take a connection from the pool, (re)connecting the slot if it is empty,
+        stale, or has reached max_messages_per_connection. The caller must put
+        the connection (or None if discarded) back with self._pool.put().
+        """
+        conn = self._pool.get()
+        try:
+            if conn is not None:
+                if conn.messages_sent >= self.max_messages_per_connection:
+                    logger.info("[EMAIL] Recycling SMTP connection after message limit")
+                    self._quit_smtp(conn.server)
+                    conn = None
+                elif not self._is_alive(conn.server):
+                    logger.info("[EMAIL] Pooled SMTP connection is stale - reconnecting")
+                    self._quit_smtp(conn.server)
+                    conn = None
+            if conn is None:
+                conn = _PooledSMTP(self._connect_smtp())
+            return conn
+        except Exception:
+            self._pool.put(None)
+            raise
+
+    @staticmethod
+    def _is_alive(server: smtplib.SMTP) -> bool:
+        try:
+            code, _ = server.noop()
+            return code == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _quit_smtp(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def close(self) -> None:
+        """Flush the outbox and close idle pooled SMTP connections (called on shutdown)"""
+        if self._worker is not None and self._worker.is_alive():
+            self._outbox.put(None)
+            self._worker.join(timeout=30)
+        for _ in range(self.pool_size):
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            if conn is not None:
+                self._quit_smtp(conn.server)
+            self._pool.put(None)
+
     def get_config_status(self) -> dict:
         """
         Get email service configuration status
@@ -324,3 +699,19 @@ class EmailService:
         except Exception as e:
             logger.error(f"SMTP connection test failed: {str(e)}")
             return False
+
+
+# One EmailService per process: it owns the outbox worker thread and the SMTP
+# pool, so every caller shares them instead of starting their own
+_shared_email_service: Optional[EmailService] = None
+_shared_email_service_lock = threading.Lock()
+
+
+def get_email_service() -> EmailService:
+    """Return the process-wide EmailService, creating it on first use"""
+    global _shared_email_service
+    if _shared_email_service is None:
+        with _shared_email_service_lock:
+            if _shared_email_service is None:
+                _shared_email_service = EmailService()
+    return _shared_email_service
@@ -1,14 +1,19 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable
 from domain.models.feedback import Feedback, TicketFeedback
 from domain.models.ifeedback_repository import IFeedbackRepository
 from domain.models.iuser_repository import IUserRepository
 from domain.models.itticket_repository import ITicketRepository
 from domain.models.itransaction_repository import ITransactionRepository
 from datetime import datetime, timedelta
+from itertools import chain
 import logging
 
 logger = logging.getLogger(__name__)
 
+_THIRTY_DAYS = timedelta(days=30)
+_SIXTY_DAYS = timedelta(days=60)
+_NINETY_DAYS = timedelta(days=90)
+
 class FeedbackService:
     def __init__(self, feedback_repository: IFeedbackRepository, user_repository: IUserRepository,
                  ticket_repository: ITicketRepository, transaction_repository: ITransactionRepository):
@@ -17,18 +22,18 @@ class FeedbackService:
         self.ticket_repository = ticket_repository
         self.transaction_repository = transaction_repository
     
+    def _ensure_user(self, user_id: int, message: str = "User not found") -> None:
+        """Raise ValueError unless the user exists"""
+        if not self.user_repository.get_by_id(user_id):
+            raise ValueError(message)
+
+    def _ensure_ticket(self, ticket_id: int) -> None:
+        """Raise ValueError unless the ticket exists"""
+        if not self.ticket_repository.get_by_id(ticket_id):
+            raise ValueError("Ticket not found")
+    
     def submit_user_feedback(self, reviewer_id: int, target_user_id: int, rating: float,
                            comment: Optional[str] = None, transaction_id: Optional[int] = None) -> Feedback:
-        # Validate reviewer exists
-        reviewer = self.user_repository.get_by_id(reviewer_id)
-        if not reviewer:
-            raise ValueError("Reviewer not found")
-
-        # Validate target user exists
-        target_user = self.user_repository.get_by_id(target_user_id)
-        if not target_user:
-            raise ValueError("Target user not found")
-
         # Prevent self-feedback
         if reviewer_id == target_user_id:
             raise ValueError("Cannot provide feedback for yourself")
@@ -37,8 +42,9 @@ class FeedbackService:
         if rating < 1 or rating > 5:
             raise ValueError("Rating must be between 1 and 5")
 
-        # Validate transaction exists if provided and involves both users
         if transaction_id:
+            # A transaction's BuyerID/SellerID are foreign keys to users, so
+            # membership in it already proves both users exist
             transaction = self.transaction_repository.get_by_id(transaction_id)
             if not transaction:
                 raise ValueError("Transaction not found")
@@ -52,6 +58,13 @@ class FeedbackService:
             existing_feedback = self.feedback_repository.get_feedback_by_transaction(transaction_id, reviewer_id)
             if existing_feedback:
                 raise ValueError("Feedback already provided for this transaction")
+        else:
+            # Validate both users exist (one query)
+            users = self.user_repository.get_by_ids([reviewer_id, target_user_id])
+            if reviewer_id not in users:
+                raise ValueError("Reviewer not found")
+            if target_user_id not in users:
+                raise ValueError("Target user not found")
 
         # Create feedback
         feedback = Feedback(
@@ -72,16 +85,14 @@ class FeedbackService:
     
     def submit_ticket_feedback(self, reviewer_id: int, ticket_id: int, rating: float, 
                              comment: Optional[str] = None) -> TicketFeedback:
-        # Validate reviewer exists
-        reviewer = self.user_repository.get_by_id(reviewer_id)
-        if not reviewer:
-            raise ValueError("Reviewer not found")
-        
-        # Validate ticket exists
-        ticket = self.ticket_repository.get_by_id(ticket_id)
+        # Ticket and reviewer are checked with one query (no ticket row -> no reviewer either)
+        ticket, reviewer, _ = self.ticket_repository.get_ticket_with_parties(ticket_id, reviewer_id)
         if not ticket:
             raise ValueError("Ticket not found")
         
+        if not reviewer:
+            raise ValueError("Reviewer not found")
+        
         # Validate rating range
         if rating < 1 or rating > 5:
             raise ValueError("Rating must be between 1 and 5")
@@ -99,60 +110,40 @@ class FeedbackService:
         return self.feedback_repository.add_ticket_feedback(feedback)
     
     def get_user_feedback(self, user_id: int, limit: int = 20, offset: int = 0) -> List[Feedback]:
-        # Validate user exists
-        user = self.user_repository.get_by_id(user_id)
-        if not user:
-            raise ValueError("User not found")
+        self._ensure_user(user_id)
         
         return self.feedback_repository.get_user_feedback(user_id, limit, offset)
     
     def get_ticket_feedback(self, ticket_id: int, limit: int = 20, offset: int = 0) -> List[TicketFeedback]:
-        # Validate ticket exists
-        ticket = self.ticket_repository.get_by_id(ticket_id)
-        if not ticket:
-            raise ValueError("Ticket not found")
+        self._ensure_ticket(ticket_id)
         
         return self.feedback_repository.get_ticket_feedback(ticket_id, limit, offset)
     
     def get_average_user_rating(self, user_id: int) -> float:
-        # Validate user exists
-        user = self.user_repository.get_by_id(user_id)
-        if not user:
-            raise ValueError("User not found")
+        self._ensure_user(user_id)
         
         return self.feedback_repository.get_average_user_rating(user_id)
     
     def get_average_ticket_rating(self, ticket_id: int) -> float:
-        # Validate ticket exists
-        ticket = self.ticket_repository.get_by_id(ticket_id)
-        if not ticket:
-            raise ValueError("Ticket not found")
+        self._ensure_ticket(ticket_id)
         
         return self.feedback_repository.get_average_ticket_rating(ticket_id)
     
     def delete_user_feedback(self, feedback_id: int, user_id: int) -> bool:
-        # Validate user exists
-        user = self.user_repository.get_by_id(user_id)
-        if not user:
-            raise ValueError("User not found")
+        self._ensure_user(user_id)
         
         # Check if user owns the feedback
-        feedback_list = self.feedback_repository.get_user_feedback(user_id, limit=1000, offset=0)
-        feedback = next((f for f in feedback_list if f.FeedbackID == feedback_id), None)
+        feedback = self.feedback_repository.get_feedback_by_id(feedback_id)
         if not feedback or feedback.ReviewerID != user_id:
             raise ValueError("Feedback not found or access denied")
         
         return self.feedback_repository.delete_user_feedback(feedback_id)
     
     def delete_ticket_feedback(self, feedback_id: int, user_id: int) -> bool:
-        # Validate user exists
-        user = self.user_repository.get_by_id(user_id)
-        if not user:
-            raise ValueError("User not found")
+        self._ensure_user(user_id)
         
         # Check if user owns the feedback
-        feedback_list = self.feedback_repository.get_ticket_feedback(0, limit=1000, offset=0)  # This needs to be improved
-        feedback = next((f for f in feedback_list if f.FeedbackID == feedback_id), None)
+        feedback = self.feedback_repository.get_ticket_feedback_by_id(feedback_id)
         if not feedback or feedback.ReviewerID != user_id:
             raise ValueError("Feedback not found or access denied")
         
@@ -168,14 +159,18 @@ class FeedbackService:
         Returns:
             Dict with feedback statistics and recent feedback
         """
-        user = self.user_repository.get_by_id(user_id)
-        if not user:
-            raise ValueError("User not found")
+        self._ensure_user(user_id)
+
+        # Calculate trend windows (last 30 days vs previous 30 days)
+        now = datetime.now()
+        thirty_days_ago = now - _THIRTY_DAYS
+        sixty_days_ago = now - _SIXTY_DAYS
 
-        # Get all feedback for user
-        all_feedback = self.feedback_repository.get_user_feedback(user_id, limit=1000, offset=0)
+        # Count, average, distribution and trend windows are aggregated in SQL
+        stats = self.feedback_repository.get_user_feedback_aggregates(user_id, thirty_days_ago, sixty_days_ago)
+        total_feedback = stats['total']
 
-        if not all_feedback:
+        if not total_feedback:
             return {
                 'user_id': user_id,
                 'average_rating': 0.0,
@@ -185,20 +180,12 @@ class FeedbackService:
                 'feedback_trend': 'neutral'
             }
 
-        # Calculate statistics
-        total_feedback = len(all_feedback)
-        average_rating = sum(f.Rating for f in all_feedback) / total_feedback
-
-        # Rating distribution
-        rating_distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-        for feedback in all_feedback:
-            rating_distribution[int(feedback.Rating)] += 1
-
         # Recent feedback (last 5)
-        recent_feedback = sorted(all_feedback, key=lambda x: x.CreatedAt, reverse=True)[:5]
+        recent_feedback = self.feedback_repository.get_user_feedback(user_id, limit=5, offset=0)
+        reviewers = self.user_repository.get_by_ids([f.ReviewerID for f in recent_feedback])
         recent_feedback_data = []
         for feedback in recent_feedback:
-            reviewer = self.user_repository.get_by_id(feedback.ReviewerID)
+            reviewer = reviewers.get(feedback.ReviewerID)
             recent_feedback_data.append({
                 'feedback_id': feedback.FeedbackID,
                 'reviewer_name': reviewer.username if reviewer else 'Unknown',
@@ -208,17 +195,13 @@ class FeedbackService:
                 'transaction_id': feedback.TransactionID
             })
 
-        # Calculate trend (last 30 days vs previous 30 days)
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        sixty_days_ago = datetime.now() - timedelta(days=60)
-
-        recent_ratings = [f.Rating for f in all_feedback if f.CreatedAt >= thirty_days_ago]
-        previous_ratings = [f.Rating for f in all_feedback if sixty_days_ago <= f.CreatedAt < thirty_days_ago]
+        recent_count = stats['recent_count']
+        previous_count = stats['previous_count']
 
         trend = 'neutral'
-        if recent_ratings and previous_ratings:
-            recent_avg = sum(recent_ratings) / len(recent_ratings)
-            previous_avg = sum(previous_ratings) / len(previous_ratings)
+        if recent_count and previous_count:
+            recent_avg = stats['recent_sum'] / recent_count
+            previous_avg = stats['previous_sum'] / previous_count
             if recent_avg > previous_avg + 0.2:
                 trend = 'improving'
             elif recent_avg < previous_avg - 0.2:
@@ -226,13 +209,13 @@ class FeedbackService:
 
         return {
             'user_id': user_id,
-            'average_rating': round(average_rating, 2),
+            'average_rating': round(stats['average'], 2),
             'total_feedback': total_feedback,
-            'rating_distribution': rating_distribution,
+            'rating_distribution': stats['distribution'],
             'recent_feedback': recent_feedback_data,
             'feedback_trend': trend,
-            'recent_feedback_count': len(recent_ratings),
-            'previous_feedback_count': len(previous_ratings)
+            'recent_feedback_count': recent_count,
+            'previous_feedback_count': previous_count
         }
 
     def get_feedback_analytics(self, user_id: int) -> Dict[str, Any]:
@@ -245,13 +228,10 @@ class FeedbackService:
         Returns:
             Dict with detailed analytics
         """
-        user = self.user_repository.get_by_id(user_id)
-        if not user:
-            raise ValueError("User not found")
+        self._ensure_user(user_id)
 
         # Get feedback as buyer and seller
-        buyer_feedback = self.feedback_repository.get_feedback_as_buyer(user_id)
-        seller_feedback = self.feedback_repository.get_feedback_as_seller(user_id)
+        buyer_feedback, seller_feedback = self.feedback_repository.get_user_role_feedback(user_id)
 
         # Calculate buyer statistics
         buyer_stats = self._calculate_feedback_stats(buyer_feedback, 'buyer')
@@ -263,7 +243,8 @@ class FeedbackService:
             'user_id': user_id,
             'buyer_analytics': buyer_stats,
             'seller_analytics': seller_stats,
-            'overall_reputation_score': self._calculate_reputation_score(buyer_feedback + seller_feedback)
+            'overall_reputation_score': self._calculate_reputation_score(
+                chain(buyer_feedback, seller_feedback), datetime.now())
         }
 
     def _calculate_feedback_stats(self, feedback_list: List[Feedback], role: str) -> Dict[str, Any]:
@@ -277,11 +258,14 @@ class FeedbackService:
             }
 
         total = len(feedback_list)
-        average = sum(f.Rating for f in feedback_list) / total
-
-        distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+        # Sum and distribution in a single pass (list indexed by rating)
+        rating_sum = 0.0
+        counts = [0] * 6
         for feedback in feedback_list:
-            distribution[int(feedback.Rating)] += 1
+            rating_sum += feedback.Rating
+            counts[int(feedback.Rating)] += 1
+        average = rating_sum / total
+        distribution = {i: counts[i] for i in range(1, 6)}
 
         return {
             'average_rating': round(average, 2),
@@ -290,29 +274,41 @@ class FeedbackService:
             'role': role
         }
 
-    def _calculate_reputation_score(self, all_feedback: List[Feedback]) -> float:
+    def _calculate_reputation_score(self, all_feedback: Iterable[Feedback],
+                                    now: Optional[datetime] = None) -> float:
         """
         Calculate overall reputation score based on feedback
 
         Args:
-            all_feedback: List of all feedback for user
+            all_feedback: All feedback for user (any iterable, consumed once)
+            now: Reference time for the recency window (defaults to datetime.now())
 
         Returns:
             Reputation score (0-100)
         """
-        if not all_feedback:
+        # Count, rating sum and recent count in a single pass
+        recent_cutoff = (now or datetime.now()) - _NINETY_DAYS
+        count = 0
+        rating_sum = 0.0
+        recent_count = 0
+        for feedback in all_feedback:
+            count += 1
+            rating_sum += feedback.Rating
+            if feedback.CreatedAt >= recent_cutoff:
+                recent_count += 1
+
+        if not count:
             return 0.0
 
         # Base score from average rating
-        average_rating = sum(f.Rating for f in all_feedback) / len(all_feedback)
+        average_rating = rating_sum / count
         base_score = (average_rating / 5.0) * 70  # 70% weight for rating
 
         # Bonus for volume (up to 20 points)
-        volume_bonus = min(len(all_feedback) * 0.5, 20)
+        volume_bonus = min(count * 0.5, 20)
 
         # Recency bonus (up to 10 points)
-        recent_feedback = [f for f in all_feedback if f.CreatedAt >= datetime.now() - timedelta(days=90)]
-        recency_bonus = min(len(recent_feedback) * 0.2, 10)
+        recency_bonus = min(recent_count * 0.2, 10)
 
         total_score = base_score + volume_bonus + recency_bonus
         return min(round(total_score, 1), 100.0)
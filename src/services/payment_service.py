@@ -5,33 +5,71 @@ from domain.models.iuser_repository import IUserRepository
 from domain.models.itransaction_repository import ITransactionRepository
 from domain.models.itticket_repository import ITicketRepository
 from datetime import datetime, timedelta
-import uuid
+from collections import Counter
+from flask import g, has_request_context
+from sqlalchemy.exc import IntegrityError
+from infrastructure.models.payment_model import FK_PAYMENT_USER, FK_PAYMENT_TRANSACTION
+from secrets import token_hex
 import logging
+import time
 from utils.momo_payment_gateway import MomoPaymentGateway
 from config import Config
 
 logger = logging.getLogger(__name__)
 
 class PaymentService:
+    # Lowercased payment method -> name of the handler method
+    _METHOD_DISPATCH = {
+        'cash': '_process_cash_payment',
+        'bank transfer': '_process_bank_transfer',
+        'digital wallet': '_process_digital_wallet',
+        'credit card': '_process_credit_card'
+    }
+
     def __init__(self, payment_repository: IPaymentRepository, user_repository: IUserRepository, transaction_repository: ITransactionRepository, ticket_repository: ITicketRepository = None):
         self.payment_repository = payment_repository
         self.user_repository = user_repository
         self.transaction_repository = transaction_repository
         self.ticket_repository = ticket_repository
+        self.reload_config()
+
+    def reload_config(self) -> None:
+        """(Re)build the MoMo gateway from Config; call if MOMO_* settings change"""
+        self._momo_gateway = MomoPaymentGateway(
+            partner_code=Config.MOMO_PARTNER_CODE,
+            access_key=Config.MOMO_ACCESS_KEY,
+            secret_key=Config.MOMO_SECRET_KEY,
+            api_endpoint=Config.MOMO_API_ENDPOINT
+        )
+
+    def _request_cached(self, kind: str, entity_id: int, loader) -> Any:
+        """
+        Load an entity once per request, keyed by (kind, id), so chained
+        service calls don't repeat the same SELECT
+        """
+        if not has_request_context():
+            return loader(entity_id)
+
+        cache = g.setdefault('_payment_entity_cache', {})
+        key = (kind, entity_id)
+        if key not in cache:
+            cache[key] = loader(entity_id)
+        return cache[key]
+
+    def _forget_cached(self, kind: str, entity_id: int) -> None:
+        """Drop a request-cached entity after it has been updated"""
+        if has_request_context():
+            g.get('_payment_entity_cache', {}).pop((kind, entity_id), None)
+
+    def _cached_get_user(self, user_id: int):
+        return self._request_cached('user', user_id, self.user_repository.get_by_id)
+
+    def _cached_get_transaction(self, transaction_id: int):
+        return self._request_cached('transaction', transaction_id, self.transaction_repository.get_by_id)
     
     def create_payment(self, methods: str, amount: float, user_id: int, title: str, transaction_id: Optional[int] = None) -> Payment:
-        # Validate user exists
-        user = self.user_repository.get_by_id(user_id)
-        if not user:
-            raise ValueError("User not found")
-        
-        # Validate transaction exists if provided
-        if transaction_id:
-            transaction = self.transaction_repository.get_by_id(transaction_id)
-            if not transaction:
-                raise ValueError("Transaction not found")
-        
-        # Create payment
+        # User/transaction existence is enforced by the payment table's foreign
+        # keys, so no SELECTs are issued before the INSERT
         payment = Payment(
             PaymentID=None,
             Methods=methods,
@@ -43,38 +81,38 @@ class PaymentService:
             TransactionID=transaction_id
         )
         
-        return self.payment_repository.add(payment)
+        try:
+            return self.payment_repository.add(payment)
+        except IntegrityError as e:
+            # Map the violated foreign key (named in PaymentModel) back to the
+            # original validation errors
+            detail = str(e.orig)
+            if FK_PAYMENT_TRANSACTION in detail:
+                raise ValueError("Transaction not found")
+            if FK_PAYMENT_USER in detail:
+                raise ValueError("User not found")
+            raise
     
     def get_payment(self, payment_id: int) -> Optional[Payment]:
         return self.payment_repository.get_by_id(payment_id)
     
     def get_user_payments(self, user_id: int) -> List[Payment]:
         # Validate user exists
-        user = self.user_repository.get_by_id(user_id)
+        user = self._cached_get_user(user_id)
         if not user:
             raise ValueError("User not found")
         
         return self.payment_repository.get_by_user_id(user_id)
     
     def update_payment_status(self, payment_id: int, status: str) -> Optional[Payment]:
-        payment = self.payment_repository.get_by_id(payment_id)
-        if not payment:
-            return None
-        
-        payment.Status = status
-        if status == 'success':
-            payment.Paid_at = datetime.now()
-        
-        return self.payment_repository.update(payment)
+        # One UPDATE ... RETURNING; a payment already in this state isn't rewritten
+        paid_at = datetime.now() if status == 'success' else None
+        return self.payment_repository.update_status(payment_id, status, paid_at)
     
     def get_payments_by_status(self, status: str) -> List[Payment]:
         return self.payment_repository.get_by_status(status)
     
     def delete_payment(self, payment_id: int) -> bool:
-        payment = self.payment_repository.get_by_id(payment_id)
-        if not payment:
-            return False
-
         return self.payment_repository.delete(payment_id)
 
     def process_payment(self, payment_id: int, payment_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -138,25 +176,17 @@ class PaymentService:
         Returns:
             Dict with processing result
         """
-        method = payment.Methods.lower()
-
-        if method == 'cash':
-            return self._process_cash_payment(payment, payment_data)
-        elif method == 'bank transfer':
-            return self._process_bank_transfer(payment, payment_data)
-        elif method == 'digital wallet':
-            return self._process_digital_wallet(payment, payment_data)
-        elif method == 'credit card':
-            return self._process_credit_card(payment, payment_data)
-        else:
+        handler = self._METHOD_DISPATCH.get(payment.Methods.lower())
+        if handler is None:
             raise ValueError(f"Unsupported payment method: {payment.Methods}")
+        return getattr(self, handler)(payment, payment_data)
 
     def _process_cash_payment(self, payment: Payment, payment_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process cash payment (manual confirmation)"""
         return {
             'status': 'success',
             'message': 'Cash payment confirmed',
-            'transaction_reference': f"CASH_{uuid.uuid4().hex[:8].upper()}"
+            'transaction_reference': f"CASH_{token_hex(4).upper()}"
         }
 
     def _process_bank_transfer(self, payment: Payment, payment_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -165,7 +195,7 @@ class PaymentService:
         return {
             'status': 'success',
             'message': 'Bank transfer completed',
-            'transaction_reference': f"BANK_{uuid.uuid4().hex[:8].upper()}"
+            'transaction_reference': f"BANK_{token_hex(4).upper()}"
         }
 
     def _process_digital_wallet(self, payment: Payment, payment_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -182,27 +212,20 @@ class PaymentService:
             return {
                 'status': 'pending',
                 'message': 'Digital wallet payment initiated',
-                'transaction_reference': f"WALLET_{uuid.uuid4().hex[:8].upper()}"
+                'transaction_reference': f"WALLET_{token_hex(4).upper()}"
             }
             
     def _process_momo_payment(self, payment: Payment, payment_data: Dict[str, Any], bank_code: Optional[str] = None, card_token: Optional[str] = None) -> Dict[str, Any]:
         """Process MoMo payment"""
         try:
-            # Initialize MoMo gateway
-            momo_gateway = MomoPaymentGateway(
-                partner_code=Config.MOMO_PARTNER_CODE,
-                access_key=Config.MOMO_ACCESS_KEY,
-                secret_key=Config.MOMO_SECRET_KEY,
-                api_endpoint=Config.MOMO_API_ENDPOINT
-            )
-            
             # Generate unique order ID
-            order_id = f"ORDER_{payment.PaymentID}_{uuid.uuid4().hex.upper()}"
+            order_id = f"ORDER_{payment.PaymentID}_{token_hex(16).upper()}"
             
             # Create payment request
-            request_start_time = datetime.now()
-            logger.debug(f"MoMo payment request details: order_id={order_id}, amount={payment.amount}, order_info={payment.Title}, return_url={Config.MOMO_RETURN_URL}, notify_url={Config.MOMO_NOTIFY_URL}. Request initiated at: {request_start_time}")
-            momo_response = momo_gateway.create_payment_request(
+            request_start = time.perf_counter()
+            logger.debug("MoMo payment request details: order_id=%s, amount=%s, order_info=%s, return_url=%s, notify_url=%s",
+                         order_id, payment.amount, payment.Title, Config.MOMO_RETURN_URL, Config.MOMO_NOTIFY_URL)
+            momo_response = self._momo_gateway.create_payment_request(
                 order_id=order_id,
                 amount=int(payment.amount),  # MoMo requires integer amount
                 order_info=f"Payment for {payment.Title}",
@@ -212,12 +235,11 @@ class PaymentService:
                 bank_code=bank_code,
                 card_token=card_token
             )
-            logger.debug(f"Payment Title: {payment.Title}")
+            logger.debug("Payment Title: %s", payment.Title)
 
-            request_end_time = datetime.now()
-            time_taken = (request_end_time - request_start_time).total_seconds()
-            logger.debug(f"MoMo payment request for order {order_id} completed in {time_taken:.2f} seconds. Response: {momo_response}")
-            logger.debug(f"MoMo API Response: {momo_response}")
+            time_taken = time.perf_counter() - request_start
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"MoMo payment request for order {order_id} completed in {time_taken:.2f} seconds. Response: {momo_response}")
             if momo_response and momo_response.get('resultCode') == 0 and momo_response.get('payUrl'):
                 return {
                     'status': 'pending',
@@ -248,7 +270,7 @@ class PaymentService:
         return {
             'status': 'success',
             'message': 'Credit card payment completed',
-            'transaction_reference': f"CARD_{uuid.uuid4().hex[:8].upper()}"
+            'transaction_reference': f"CARD_{token_hex(4).upper()}"
         }
 
     def get_payment_history(self, user_id: int, limit: int = 50, offset: int = 0) -> Dict[str, Any]:
@@ -263,12 +285,11 @@ class PaymentService:
         Returns:
             Dict with payments and pagination info
         """
-        user = self.user_repository.get_by_id(user_id)
+        user = self._cached_get_user(user_id)
         if not user:
             raise ValueError("User not found")
 
-        payments = self.payment_repository.get_user_payments_paginated(user_id, limit, offset)
-        total_count = self.payment_repository.get_user_payments_count(user_id)
+        payments, total_count = self.payment_repository.get_user_payments_page(user_id, limit, offset)
 
         return {
             'payments': payments,
@@ -288,25 +309,38 @@ class PaymentService:
         Returns:
             Dict with payment statistics
         """
-        user = self.user_repository.get_by_id(user_id)
+        user = self._cached_get_user(user_id)
         if not user:
             raise ValueError("User not found")
 
-        payments = self.payment_repository.get_by_user_id(user_id)
-
-        total_payments = len(payments)
-        successful_payments = len([p for p in payments if p.Status == 'success'])
-        failed_payments = len([p for p in payments if p.Status == 'failed'])
-        pending_payments = len([p for p in payments if p.Status == 'pending'])
+        # Count/amount per (status, method) is grouped in SQL; fold the k rows here
+        status_counts = Counter()
+        total_amount = 0.0
+        method_stats = {}
+        for status, method, count, amount in self.payment_repository.get_user_stats(user_id):
+            status_counts[status] += count
+            stats = method_stats.get(method)
+            if stats is None:
+                stats = method_stats[method] = [0, 0.0]
+            stats[0] += count
+            if status == 'success':
+                total_amount += amount
+                stats[1] += amount
+
+        total_payments = sum(status_counts.values())
+        successful_payments = status_counts['success']
 
-        total_amount = sum(p.amount for p in payments if p.Status == 'success')
-        
         return {
             'total_payments': total_payments,
             'successful_payments': successful_payments,
-            'failed_payments': failed_payments,
-            'pending_payments': pending_payments,
-            'total_amount': total_amount
+            'failed_payments': status_counts['failed'],
+            'pending_payments': status_counts['pending'],
+            'total_amount': total_amount,
+            'success_rate': (successful_payments / total_payments * 100) if total_payments > 0 else 0,
+            'method_breakdown': {
+                method: {'count': count, 'amount': amount}
+                for method, (count, amount) in method_stats.items()
+            }
         }
         
     def update_transaction_reference(self, transaction_id: int, reference: str) -> Any:
@@ -320,12 +354,13 @@ class PaymentService:
         Returns:
             Updated transaction
         """
-        transaction = self.transaction_repository.get_by_id(transaction_id)
+        transaction = self._cached_get_transaction(transaction_id)
         if not transaction:
             raise ValueError(f"Transaction not found with ID: {transaction_id}")
             
         transaction.ReferenceNumber = reference
         updated_transaction = self.transaction_repository.update(transaction)
+        self._forget_cached('transaction', transaction_id)
         
         logger.info(f"Updated transaction {transaction_id} with reference {reference}")
         return updated_transaction
@@ -340,46 +375,25 @@ class PaymentService:
         Returns:
             Updated transaction
         """
-        transaction = self.transaction_repository.get_by_id(transaction_id)
+        # Transaction and its ticket in one joined SELECT
+        transaction, ticket = self.transaction_repository.get_with_ticket(transaction_id)
         if not transaction:
             raise ValueError(f"Transaction not found with ID: {transaction_id}")
             
         # Update transaction status
         transaction.Status = 'completed'
         updated_transaction = self.transaction_repository.update(transaction)
+        self._forget_cached('transaction', transaction_id)
         
         # If this is a ticket purchase, update ticket status
-        if transaction.TicketID:
-            ticket = self.ticket_repository.get_by_id(transaction.TicketID)
-            if ticket:
-                ticket.Status = 'sold'
-                self.ticket_repository.update(ticket)
-                logger.info(f"Updated ticket {ticket.TicketID} status to 'sold'")
+        if ticket:
+            ticket.Status = 'sold'
+            self.ticket_repository.update(ticket)
+            logger.info(f"Updated ticket {ticket.TicketID} status to 'sold'")
             
         logger.info(f"Completed transaction {transaction_id}")
         return updated_transaction
 
-        # Payment method breakdown
-        method_stats = {}
-        for payment in payments:
-            method = payment.Methods
-            if method not in method_stats:
-                method_stats[method] = {'count': 0, 'amount': 0}
-            method_stats[method]['count'] += 1
-            if payment.Status == 'success':
-                method_stats[method]['amount'] += payment.amount
-
-        return {
-            'total_payments': total_payments,
-            'successful_payments': successful_payments,
-            'failed_payments': failed_payments,
-            'pending_payments': pending_payments,
-            'total_amount': total_amount,
-            'success_rate': (successful_payments / total_payments * 100) if total_payments > 0 else 0,
-            'method_breakdown': method_stats
-        }
-
-
     def handle_momo_callback(self, callback_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Handle callback from MoMo payment gateway and update payment status
@@ -393,52 +407,26 @@ class PaymentService:
         logger.info(f"Received MoMo payment callback: {callback_data}")
 
         try:
-            # Initialize MoMo gateway
-            momo_gateway = MomoPaymentGateway(
-                partner_code=Config.MOMO_PARTNER_CODE,
-                access_key=Config.MOMO_ACCESS_KEY,
-                secret_key=Config.MOMO_SECRET_KEY,
-                api_endpoint=Config.MOMO_API_ENDPOINT
-            )
-
             # Process callback data
-            process_result = momo_gateway.process_payment_callback(callback_data)
+            process_result = self._momo_gateway.process_payment_callback(callback_data)
             
             if not process_result['success']:
                 logger.error(f"MoMo callback processing failed: {process_result['message']}")
                 
                 # Nếu xử lý callback thất bại, kiểm tra xem có payment_id không
                 if 'payment_id' in process_result:
-                    payment_id = int(process_result['payment_id'])
-                    payment = self.payment_repository.get_by_id(payment_id)
-                    
-                    if payment and payment.TransactionID:
-                        # Cập nhật trạng thái payment thành 'failed'
-                        payment.Status = 'failed'
-                        self.payment_repository.update(payment)
-                        
-                        # Cập nhật trạng thái transaction và vé
-                        transaction = self.transaction_repository.get_by_id(payment.TransactionID)
-                        if transaction:
-                            transaction.Status = 'failed'
-                            self.transaction_repository.update(transaction)
-                            
-                            # Lấy thông tin vé và cập nhật trạng thái thành 'Available'
-                            ticket = self.ticket_repository.get_by_id(transaction.TicketID)
-                            if ticket:
-                                ticket.Status = 'Available'
-                                self.ticket_repository.update(ticket)
-                                logger.info(f"Updated ticket {ticket.TicketID} status to 'Available' due to failed payment")
+                    self._finalize_payment(int(process_result['payment_id']), 'failed')
                 
                 return process_result
 
             # Extract payment ID from callback data
             payment_id = int(process_result['payment_id'])
-            transaction_id = process_result['transaction_id']
 
-            # Get payment from database
-            payment = self.payment_repository.get_by_id(payment_id)
-            if not payment:
+            # Final status based on error_code
+            succeeded = process_result.get('error_code', 0) == 0 and process_result.get('status') == 'success'
+            updated_payment = self._finalize_payment(payment_id, 'success' if succeeded else 'failed')
+
+            if not updated_payment:
                 error_msg = f"Payment not found with ID: {payment_id}"
                 logger.error(error_msg)
                 return {
@@ -446,64 +434,18 @@ class PaymentService:
                     'message': error_msg
                 }
 
-            # Update payment status based on error_code
-            if process_result.get('error_code', 0) == 0 and process_result.get('status') == 'success':
-                # Thanh toán thành công
-                payment.Status = 'success'
-                payment.Paid_at = datetime.now()
-                payment.transaction_reference = transaction_id
-                
-                # Update payment in database
-                updated_payment = self.payment_repository.update(payment)
-                
-                # If payment is associated with a transaction, update transaction status
-                if payment.TransactionID:
-                    transaction = self.transaction_repository.get_by_id(payment.TransactionID)
-                    if transaction:
-                        transaction.Status = 'paid'
-                        self.transaction_repository.update(transaction)
-                        logger.info(f"Updated transaction {transaction.TransactionID} status to 'paid'")
-                        
-                        # Cập nhật trạng thái vé thành 'Sold'
-                        ticket = self.ticket_repository.get_by_id(transaction.TicketID)
-                        if ticket:
-                            ticket.Status = 'Sold'
-                            self.ticket_repository.update(ticket)
-                            logger.info(f"Updated ticket {ticket.TicketID} status to 'Sold' due to successful payment")
-
-                logger.info(f"Successfully updated payment {payment_id} status to 'success'")
-                
+            if succeeded:
                 return {
                     'success': True,
                     'message': 'Payment status updated successfully',
                     'payment': updated_payment
                 }
-            else:
-                # Thanh toán thất bại
-                payment.Status = 'failed'
-                updated_payment = self.payment_repository.update(payment)
-                
-                # Nếu payment liên kết với transaction, cập nhật trạng thái transaction và vé
-                if payment.TransactionID:
-                    transaction = self.transaction_repository.get_by_id(payment.TransactionID)
-                    if transaction:
-                        transaction.Status = 'failed'
-                        self.transaction_repository.update(transaction)
-                        
-                        # Cập nhật trạng thái vé thành 'Available'
-                        ticket = self.ticket_repository.get_by_id(transaction.TicketID)
-                        if ticket:
-                            ticket.Status = 'Available'
-                            self.ticket_repository.update(ticket)
-                            logger.info(f"Updated ticket {ticket.TicketID} status to 'Available' due to failed payment")
-                
-                logger.info(f"Payment {payment_id} failed with error code: {process_result.get('error_code')}")
-                
-                return {
-                    'success': False,
-                    'message': f"Payment failed: {process_result.get('message', 'Unknown error')}",
-                    'payment': updated_payment
-                }
+
+            return {
+                'success': False,
+                'message': f"Payment failed: {process_result.get('message', 'Unknown error')}",
+                'payment': updated_payment
+            }
 
         except Exception as e:
             error_msg = f"Error handling MoMo callback: {e}"
@@ -512,3 +454,26 @@ class PaymentService:
                 'success': False,
                 'message': error_msg
             }
+
+    def _finalize_payment(self, payment_id: int, new_status: str) -> Optional[Payment]:
+        """
+        Apply the final callback status to a payment and cascade it to its
+        transaction and ticket in one database commit
+
+        Args:
+            payment_id: Payment ID
+            new_status: 'success' or 'failed'
+
+        Returns:
+            Updated payment, or None if it does not exist
+        """
+        if new_status == 'success':
+            # payment -> 'success', transaction -> 'paid', ticket -> 'Sold'
+            payment = self.payment_repository.complete_payment_cascade(payment_id)
+        else:
+            # payment, transaction -> 'failed', ticket -> 'Available'
+            payment = self.payment_repository.fail_payment_cascade(payment_id)
+
+        if payment:
+            logger.info(f"Payment {payment_id} finalized as '{new_status}' (transaction {payment.TransactionID})")
+        return payment
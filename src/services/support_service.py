@@ -2,21 +2,111 @@ from typing import List, Optional
 from domain.models.support import Support
 from domain.models.isupport_repository import ISupportRepository
 from domain.models.iuser_repository import IUserRepository
+from domain.models.ioutbox_repository import IOutboxRepository
 from datetime import datetime
-from services.email_service import EmailService
+from services.email_service import EmailService, get_email_service
+from jinja2 import Template
 import logging
 
 logger = logging.getLogger(__name__)
 
+_STATUS_CHOICES = ('open', 'in_progress', 'resolved', 'closed')
+_VALID_STATUSES = frozenset(_STATUS_CHOICES)
+
+
+# Admin notification templates, compiled once at import. The HTML one is
+# autoescaped since title/description are user input.
+_ADMIN_HTML_TMPL = Template("""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="UTF-8">
+            <title>New Support Ticket</title>
+            <style>
+                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+                .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+                .header { background-color: #007bff; color: white; padding: 20px; text-align: center; }
+                .content { padding: 30px; background-color: #f9f9f9; }
+                .ticket-info { padding: 15px; background-color: white; border: 1px solid #ddd; margin: 20px 0; }
+                .footer { padding: 20px; text-align: center; color: #666; font-size: 12px; }
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>New Support Ticket</h1>
+                </div>
+                <div class="content">
+                    <h2>Hello {{ admin_name }},</h2>
+                    <p>A new support ticket has been created and requires your attention.</p>
+                    
+                    <div class="ticket-info">
+                        <p><strong>Ticket ID:</strong> {{ support.SupportID }}</p>
+                        <p><strong>User:</strong> {{ username }}</p>
+                        <p><strong>Title:</strong> {{ support.Title }}</p>
+                        <p><strong>Description:</strong> {{ description }}</p>
+                        <p><strong>Status:</strong> {{ support.Status }}</p>
+                        <p><strong>Created:</strong> {{ created_at }}</p>
+                    </div>
+                    
+                    <p>Please review this ticket at your earliest convenience.</p>
+                    
+                    <p>Best regards,<br>The TicketResell System</p>
+                </div>
+                <div class="footer">
+                    <p>This is an automated message. Please do not reply to this email.</p>
+                    <p>&copy; 2024 TicketResell. All rights reserved.</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """, autoescape=True, keep_trailing_newline=True)
+
+# Plain text version for email clients that don't support HTML
+_ADMIN_TXT_TMPL = Template("""
+        Hello {{ admin_name }},
+
+        A new support ticket has been created and requires your attention.
+
+        Ticket ID: {{ support.SupportID }}
+        User: {{ username }}
+        Title: {{ support.Title }}
+        Description: {{ description }}
+        Status: {{ support.Status }}
+        Created: {{ created_at }}
+
+        Please review this ticket at your earliest convenience.
+
+        Best regards,
+        The TicketResell System
+        """, keep_trailing_newline=True)
+
+ADMIN_ROLE_ID = 1
+
+# Outbox event written together with each new support ticket
+SUPPORT_CREATED_EVENT = 'support_created'
+# Delivery attempts per event before the worker gives up on it
+NOTIFICATION_MAX_ATTEMPTS = 5
+
 class SupportService:
-    def __init__(self, support_repository: ISupportRepository, user_repository: IUserRepository, email_service: Optional[EmailService] = None):
+    def __init__(self, support_repository: ISupportRepository, user_repository: IUserRepository,
+                 email_service: Optional[EmailService] = None,
+                 outbox_repository: Optional[IOutboxRepository] = None):
         self.support_repository = support_repository
         self.user_repository = user_repository
-        self.email_service = email_service or EmailService()
+        self.email_service = email_service or get_email_service()
+        # When set, admin notifications are written to the outbox and sent by
+        # process_notification_outbox (see scripts/support_outbox_worker.py)
+        self.outbox_repository = outbox_repository
     
     def create_support_ticket(self, user_id: int, title: str, issue_description: str = None, recipient_type: str = 'admin', recipient_id: Optional[int] = None) -> Support:
-        # Validate user exists
-        user = self.user_repository.get_by_id(user_id)
+        if self.outbox_repository is not None:
+            # Admins are resolved by the outbox worker; only the submitter is needed here
+            user = self.user_repository.get_by_id(user_id)
+            admin_users = None
+        else:
+            # Validate user exists and load the admin recipients in one query
+            user, admin_users = self._get_submitter_and_admins(user_id)
         if not user:
             raise ValueError("User not found")
         
@@ -33,17 +123,27 @@ class SupportService:
             RecipientID=recipient_id
         )
         
+        if self.outbox_repository is not None:
+            # Ticket and notification event are committed together
+            return self.support_repository.add_with_outbox(support, SUPPORT_CREATED_EVENT, {
+                'UserID': user_id,
+                'Username': user.username,
+                'Title': title,
+                'Issue_des': issue_description,
+                'Status': support.Status,
+                'Create_at': support.Create_at.strftime('%Y-%m-%d %H:%M:%S')
+            })
+        
         # Add the support ticket to the database
         created_support = self.support_repository.add(support)
         
         # Send notification to admin
         try:
-            # Get admin users (assuming role_id 1 is admin)
-            admin_users = self.user_repository.get_by_role_id(1)
-            
             if admin_users:
+                created_at = created_support.Create_at.strftime('%Y-%m-%d %H:%M:%S')
                 for admin in admin_users:
-                    self._send_admin_notification(admin.email, admin.username, user.username, created_support)
+                    self._send_admin_notification(admin.email, admin.username, user.username,
+                                                  created_support, created_at)
             else:
                 logger.warning("No admin users found to notify about new support ticket")
         except Exception as e:
@@ -51,65 +151,120 @@ class SupportService:
         
         return created_support
     
+    def _get_submitter_and_admins(self, user_id: int):
+        # Admins are read fresh every time so a demoted admin stops receiving
+        # ticket details immediately, in every worker process
+        return self.user_repository.get_submitter_and_admins(user_id, ADMIN_ROLE_ID)
+    
+    def process_notification_outbox(self, limit: int = 100) -> int:
+        """
+        Send admin notifications for up to limit pending support_created events
+        over one pooled SMTP connection. Events are marked sent only when every
+        admin email went out; otherwise they are released for a later retry
+        (at-least-once delivery).
+        
+        Returns:
+            Number of events marked sent
+        """
+        # One admin lookup per batch, before claiming: with no recipients the
+        # events stay untouched instead of using up their delivery attempts
+        admin_users = self.user_repository.get_by_role_id(ADMIN_ROLE_ID)
+        if not admin_users:
+            logger.warning("No admin users found to notify about new support tickets")
+            return 0
+        
+        events = self.outbox_repository.claim_pending(SUPPORT_CREATED_EVENT, limit,
+                                                      NOTIFICATION_MAX_ATTEMPTS)
+        if not events:
+            return 0
+        
+        messages = []
+        owners = []
+        for event in events:
+            payload = event.Payload
+            support = Support(
+                SupportID=payload['SupportID'],
+                UserID=payload['UserID'],
+                Status=payload['Status'],
+                Create_at=None,
+                Updated_at=None,
+                Issue_des=payload['Issue_des'],
+                Title=payload['Title'],
+                RecipientType='admin',
+                RecipientID=None
+            )
+            for admin in admin_users:
+                subject, text_body, html_body = self._render_admin_notification(
+                    admin.username, payload['Username'], support, payload['Create_at']
+                )
+                messages.append((admin.email, subject, text_body, html_body))
+                owners.append(event.OutboxID)
+        
+        results = self.email_service.send_bulk(messages, self.email_service.send_batch_size)
+        failed = {owner for owner, (_, sent) in zip(owners, results) if not sent}
+        sent_ids = [event.OutboxID for event in events if event.OutboxID not in failed]
+        self.outbox_repository.mark_sent(sent_ids)
+        if failed:
+            exhausted = sorted(event.OutboxID for event in events
+                               if event.OutboxID in failed and event.Attempts >= NOTIFICATION_MAX_ATTEMPTS)
+            if exhausted:
+                logger.error(f"Giving up on admin notification for support event(s) {exhausted} "
+                             f"after {NOTIFICATION_MAX_ATTEMPTS} attempts")
+            retrying = len(failed) - len(exhausted)
+            if retrying:
+                logger.warning(f"Admin notification failed for {retrying} support event(s); will retry")
+            self.outbox_repository.release(sorted(failed))
+        return len(sent_ids)
+    
     def get_support_ticket(self, support_id: int) -> Optional[Support]:
         return self.support_repository.get_by_id(support_id)
     
     def get_user_support_tickets(self, user_id: int) -> List[Support]:
-        # Validate user exists
-        user = self.user_repository.get_by_id(user_id)
-        if not user:
+        supports = self.support_repository.get_by_user_id(user_id)
+        # Only an empty result needs the existence check
+        if not supports and not self.user_repository.get_by_id(user_id):
             raise ValueError("User not found")
         
-        return self.support_repository.get_by_user_id(user_id)
+        return supports
     
-    def get_all_support_tickets(self) -> List[Support]:
-        """Get all support tickets (admin function)"""
-        return self.support_repository.get_all()
+    def get_all_support_tickets(self, before_id: Optional[int] = None, limit: int = 200) -> List[Support]:
+        """
+        Get support tickets newest first, one keyset page at a time (admin function).
+        Pass the last SupportID of a page as before_id to get the next one.
+        """
+        return self.support_repository.get_page(before_id, limit)
     
     def get_support_tickets_by_status(self, status: str) -> List[Support]:
         """Get support tickets by status"""
-        valid_statuses = ['open', 'in_progress', 'resolved', 'closed']
-        if status not in valid_statuses:
-            raise ValueError(f"Invalid status. Must be one of: {valid_statuses}")
+        if status not in _VALID_STATUSES:
+            raise ValueError(f"Invalid status. Must be one of: {list(_STATUS_CHOICES)}")
         
         return self.support_repository.get_by_status(status)
     
     def update_support_ticket(self, support_id: int, title: str = None, issue_description: str = None, status: str = None) -> Optional[Support]:
-        support = self.support_repository.get_by_id(support_id)
-        if not support:
-            return None
-        
+        values = {}
         if title:
-            support.Title = title
+            values['Title'] = title
         if issue_description:
-            support.Issue_des = issue_description
+            values['Issue_des'] = issue_description
         if status:
-            valid_statuses = ['open', 'in_progress', 'resolved', 'closed']
-            if status not in valid_statuses:
-                raise ValueError(f"Invalid status. Must be one of: {valid_statuses}")
-            support.Status = status
+            if status not in _VALID_STATUSES:
+                raise ValueError(f"Invalid status. Must be one of: {list(_STATUS_CHOICES)}")
+            values['Status'] = status
         
-        support.Updated_at = datetime.now()
-        
-        return self.support_repository.update(support)
+        # One UPDATE ... RETURNING; None if the ticket doesn't exist
+        return self.support_repository.update_fields(support_id, **values)
     
     def update_support_status(self, support_id: int, status: str) -> bool:
         """Update only the status of a support ticket"""
-        valid_statuses = ['open', 'in_progress', 'resolved', 'closed']
-        if status not in valid_statuses:
-            raise ValueError(f"Invalid status. Must be one of: {valid_statuses}")
-        
-        support = self.support_repository.get_by_id(support_id)
-        if not support:
-            return False
+        if status not in _VALID_STATUSES:
+            raise ValueError(f"Invalid status. Must be one of: {list(_STATUS_CHOICES)}")
         
+        # Returns False when no row matched
         return self.support_repository.update_status(support_id, status)
     
     def delete_support_ticket(self, support_id: int) -> bool:
-        support = self.support_repository.get_by_id(support_id)
-        if not support:
-            return False
-        
+        # Returns False when no row matched
         return self.support_repository.delete(support_id)
     
     def close_support_ticket(self, support_id: int) -> bool:
@@ -120,80 +275,30 @@ class SupportService:
         """Mark a support ticket as resolved"""
         return self.update_support_status(support_id, 'resolved')
     
-    def _send_admin_notification(self, admin_email: str, admin_name: str, username: str, support: Support) -> bool:
+    def _render_admin_notification(self, admin_name: str, username: str, support: Support,
+                                   created_at: Optional[str] = None):
+        """(subject, text body, html body) of the new-ticket email for one admin"""
+        context = {
+            'admin_name': admin_name,
+            'username': username,
+            'support': support,
+            'description': support.Issue_des or 'No description provided',
+            'created_at': created_at or support.Create_at.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        return (f"New Support Ticket: {support.Title}",
+                _ADMIN_TXT_TMPL.render(context), _ADMIN_HTML_TMPL.render(context))
+    
+    def _send_admin_notification(self, admin_email: str, admin_name: str, username: str, support: Support,
+                                 created_at: Optional[str] = None) -> bool:
         """Send notification email to admin about new support ticket"""
-        subject = f"New Support Ticket: {support.Title}"
-        
-        # HTML email template
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <title>New Support Ticket</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background-color: #007bff; color: white; padding: 20px; text-align: center; }}
-                .content {{ padding: 30px; background-color: #f9f9f9; }}
-                .ticket-info {{ padding: 15px; background-color: white; border: 1px solid #ddd; margin: 20px 0; }}
-                .footer {{ padding: 20px; text-align: center; color: #666; font-size: 12px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>New Support Ticket</h1>
-                </div>
-                <div class="content">
-                    <h2>Hello {admin_name},</h2>
-                    <p>A new support ticket has been created and requires your attention.</p>
-                    
-                    <div class="ticket-info">
-                        <p><strong>Ticket ID:</strong> {support.SupportID}</p>
-                        <p><strong>User:</strong> {username}</p>
-                        <p><strong>Title:</strong> {support.Title}</p>
-                        <p><strong>Description:</strong> {support.Issue_des or 'No description provided'}</p>
-                        <p><strong>Status:</strong> {support.Status}</p>
-                        <p><strong>Created:</strong> {support.Create_at.strftime('%Y-%m-%d %H:%M:%S')}</p>
-                    </div>
-                    
-                    <p>Please review this ticket at your earliest convenience.</p>
-                    
-                    <p>Best regards,<br>The TicketResell System</p>
-                </div>
-                <div class="footer">
-                    <p>This is an automated message. Please do not reply to this email.</p>
-                    <p>&copy; 2024 TicketResell. All rights reserved.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Plain text version for email clients that don't support HTML
-        text_body = f"""
-        Hello {admin_name},
-
-        A new support ticket has been created and requires your attention.
-
-        Ticket ID: {support.SupportID}
-        User: {username}
-        Title: {support.Title}
-        Description: {support.Issue_des or 'No description provided'}
-        Status: {support.Status}
-        Created: {support.Create_at.strftime('%Y-%m-%d %H:%M:%S')}
-
-        Please review this ticket at your earliest convenience.
-
-        Best regards,
-        The TicketResell System
-        """
+        subject, text_body, html_body = self._render_admin_notification(admin_name, username, support, created_at)
         
         try:
-            result = self.email_service._send_email(admin_email, subject, text_body, html_body)
+            # Queued for the EmailService background worker, which flushes
+            # all admin notifications in one batch over a pooled connection
+            result = self.email_service.queue_email(admin_email, subject, text_body, html_body)
             if result:
-                logger.info(f"Admin notification sent successfully to {admin_email} for support ticket {support.SupportID}")
+                logger.info(f"Admin notification queued for {admin_email} for support ticket {support.SupportID}")
             else:
                 logger.warning(f"Failed to send admin notification to {admin_email} for support ticket {support.SupportID}")
             return result
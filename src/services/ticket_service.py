@@ -47,18 +47,24 @@ class TicketService:
         self.ticket_repository.delete(ticket_id)
         return True
 
-    def search_tickets_by_event_name(self, event_name: str) -> List[Ticket]:
+    def search_tickets_by_event_name(self, event_name: str, limit: int = 50,
+                                     after_price: float = None, after_id: int = None) -> List[Ticket]:
         """Search tickets by event name"""
-        return self.ticket_repository.search_tickets_by_event_name(event_name)
+        return self.ticket_repository.search_tickets_by_event_name(
+            event_name, limit, after_price, after_id
+        )
 
     def search_tickets_advanced(self, event_name: str = None, event_type: str = None,
                                min_price: float = None, max_price: float = None,
                                location: str = None, ticket_type: str = None,
-                               is_negotiable: bool = None, limit: int = 50) -> List[Ticket]:
+                               is_negotiable: bool = None, limit: int = 50,
+                               after_rating: float = None, after_price: float = None,
+                               after_id: int = None) -> List[Ticket]:
         """Advanced search with multiple filters"""
         return self.ticket_repository.search_tickets_advanced(
             event_name, event_type, min_price, max_price, 
-            location, ticket_type, is_negotiable, limit
+            location, ticket_type, is_negotiable, limit,
+            after_rating, after_price, after_id
         )
 
     def get_tickets_by_event_type(self, event_type: str, limit: int = 20) -> List[Ticket]:
@@ -1,24 +1,35 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 from domain.models.transaction import Transaction
+from domain.models.ticket import Ticket
 from domain.models.itransaction_repository import ITransactionRepository
 from domain.models.itticket_repository import ITicketRepository
 from domain.models.iuser_repository import IUserRepository
 from datetime import datetime
 import uuid
+import logging
+
+logger = logging.getLogger(__name__)
 
 class TransactionService:
+    # Callback status -> (ticket statuses it may move from, ticket status to set, ticket move required)
+    _CALLBACK_TICKET_TRANSITIONS = {
+        # Nếu thanh toán thành công, cập nhật trạng thái vé thành "Sold"
+        'success': (("Reserved", "Available"), "Sold", True),
+        # Nếu thanh toán thất bại, rollback trạng thái vé về "Available"
+        'failed': (("Reserved",), "Available", False),
+    }
+
     def __init__(self, transaction_repository: ITransactionRepository, ticket_repository: ITicketRepository, user_repository: IUserRepository):
         self.transaction_repository = transaction_repository
         self.ticket_repository = ticket_repository
         self.user_repository = user_repository
     
     def initiate_transaction(self, ticket_id: int, buyer_id: int, amount: float, payment_method: str, reserve_ticket: bool = False) -> Transaction:
-        import logging
-        logger = logging.getLogger(__name__)
-        
+        ticket = None
+        reserved = False
         try:
-            # Validate ticket exists and is available
-            ticket = self.ticket_repository.get_by_id(ticket_id)
+            # Ticket, buyer and seller in one round-trip
+            ticket, buyer, seller = self.ticket_repository.get_ticket_with_parties(ticket_id, buyer_id)
             if not ticket:
                 raise ValueError("Ticket not found")
             
@@ -27,12 +38,10 @@ class TransactionService:
                 raise ValueError(f"Ticket is not available for purchase. Current status: {ticket.Status}")
             
             # Validate buyer exists
-            buyer = self.user_repository.get_by_id(buyer_id)
             if not buyer:
                 raise ValueError("Buyer not found")
             
             # Validate seller exists
-            seller = self.user_repository.get_by_id(ticket.OwnerID)
             if not seller:
                 raise ValueError("Seller not found")
             
@@ -40,11 +49,21 @@ class TransactionService:
             if ticket.OwnerID == buyer_id:
                 raise ValueError("Cannot purchase your own ticket")
 
-            # Atomic operation: Reserve ticket and create transaction
+            # Atomic operation: Available -> Reserved in one conditional UPDATE,
+            # so only one of two concurrent buyers can win the reservation
             if reserve_ticket and ticket.Status == "Available":
-                ticket.Status = "Reserved"
-                self.ticket_repository.update(ticket)
-                logger.info(f"Ticket {ticket_id} reserved for buyer {buyer_id}")
+                reserved_ticket = self.ticket_repository.try_reserve(ticket_id)
+                if reserved_ticket:
+                    ticket = reserved_ticket
+                    reserved = True
+                    logger.info(f"Ticket {ticket_id} reserved for buyer {buyer_id}")
+                else:
+                    # Lost the race - another buyer holds the ticket; the re-read
+                    # only picks the error message
+                    current = self.ticket_repository.get_by_id(ticket_id)
+                    if not current:
+                        raise ValueError("Ticket not found")
+                    raise ValueError(f"Ticket is not available for purchase. Current status: {current.Status}")
 
             # Create transaction record
             transaction = Transaction(
@@ -55,7 +74,7 @@ class TransactionService:
                 Amount=amount,
                 PaymentMethod=payment_method,
                 Status="pending",
-                PaymentTransactionID=str(uuid.uuid4()),
+                PaymentTransactionID=uuid.uuid4().hex,
                 CreatedAt=datetime.now(),
                 UpdatedAt=None
             )
@@ -68,81 +87,42 @@ class TransactionService:
         except Exception as e:
             logger.error(f"Error initiating transaction for ticket {ticket_id}: {str(e)}")
             # Rollback ticket reservation if it was reserved
-            if reserve_ticket:
-                try:
-                    ticket = self.ticket_repository.get_by_id(ticket_id)
-                    if ticket and ticket.Status == "Reserved":
-                        ticket.Status = "Available"
-                        self.ticket_repository.update(ticket)
-                        logger.info(f"Rolled back ticket {ticket_id} reservation due to error")
-                except Exception as rollback_error:
-                    logger.error(f"Error rolling back ticket reservation: {rollback_error}")
+            if reserved:
+                self._rollback_reservation(ticket)
             raise
     
+    def _rollback_reservation(self, ticket) -> None:
+        """Release a reservation made by initiate_transaction, reusing the ticket already loaded"""
+        try:
+            if self.ticket_repository.transition_status(ticket.TicketID, ("Reserved",), "Available"):
+                logger.info(f"Rolled back ticket {ticket.TicketID} reservation due to error")
+        except Exception as rollback_error:
+            logger.error(f"Error rolling back ticket reservation: {rollback_error}")
+    
     def process_transaction_callback(self, transaction_id: int, status: str, payment_transaction_id: str = None) -> Transaction:
-        import logging
-        logger = logging.getLogger(__name__)
-        
         try:
-            transaction = self.transaction_repository.get_by_id(transaction_id)
+            logger.info(f"Processing transaction callback for {transaction_id}: {status}")
+            
+            # Atomic operation: transaction and ticket status change in one DB transaction;
+            # a transaction already in this status is left untouched
+            ticket_from, ticket_to, require_ticket = self._CALLBACK_TICKET_TRANSITIONS.get(status, ((), None, False))
+            transaction, changed = self.transaction_repository.update_status_with_ticket(
+                transaction_id, status, payment_transaction_id,
+                ticket_from=ticket_from, ticket_to=ticket_to, require_ticket=require_ticket
+            )
             if not transaction:
                 raise ValueError("Transaction not found")
             
-            logger.info(f"Processing transaction callback for {transaction_id}: {status}")
-            
             # Prevent duplicate processing
-            if transaction.Status == status:
+            if not changed:
                 logger.warning(f"Transaction {transaction_id} already has status {status}")
                 return transaction
             
-            # Update transaction status
-            old_status = transaction.Status
-            transaction.Status = status
-            if payment_transaction_id:
-                transaction.PaymentTransactionID = payment_transaction_id
-            transaction.UpdatedAt = datetime.now()
-            
-            # Atomic operation: Update transaction and ticket status together
-            if status == "success":
-                # Nếu thanh toán thành công, cập nhật trạng thái vé thành "Sold"
-                ticket = self.ticket_repository.get_by_id(transaction.TicketID)
-                if not ticket:
-                    raise ValueError(f"Ticket {transaction.TicketID} not found")
-                
-                if ticket.Status not in ["Reserved", "Available"]:
-                    raise ValueError(f"Cannot complete transaction - ticket status is {ticket.Status}")
-                
-                ticket.Status = "Sold"
-                self.ticket_repository.update(ticket)
-                logger.info(f"Ticket {transaction.TicketID} marked as sold")
-                
-            elif status == "failed":
-                # Nếu thanh toán thất bại, rollback trạng thái vé về "Available"
-                ticket = self.ticket_repository.get_by_id(transaction.TicketID)
-                if ticket and ticket.Status == "Reserved":
-                    ticket.Status = "Available"
-                    self.ticket_repository.update(ticket)
-                    logger.info(f"Ticket {transaction.TicketID} released back to available")
-            
-            # Update transaction record
-            updated_transaction = self.transaction_repository.update(transaction)
-            logger.info(f"Transaction {transaction_id} updated from {old_status} to {status}")
-            
-            return updated_transaction
+            logger.info(f"Transaction {transaction_id} updated to {status}")
+            return transaction
             
         except Exception as e:
             logger.error(f"Error processing transaction callback for {transaction_id}: {str(e)}")
-            # In case of error, try to rollback any partial changes
-            try:
-                if status == "success":
-                    # If we were trying to mark as success but failed, ensure ticket is not left in inconsistent state
-                    ticket = self.ticket_repository.get_by_id(transaction.TicketID)
-                    if ticket and ticket.Status == "Sold":
-                        ticket.Status = "Reserved"  # Rollback to reserved state
-                        self.ticket_repository.update(ticket)
-                        logger.info(f"Rolled back ticket {transaction.TicketID} from Sold to Reserved due to error")
-            except Exception as rollback_error:
-                logger.error(f"Error during rollback: {rollback_error}")
             raise
     
     def get_transaction_by_id(self, transaction_id: int) -> Optional[Transaction]:
@@ -151,8 +131,17 @@ class TransactionService:
     def get_transactions_by_user(self, user_id: int) -> List[Transaction]:
         return self.transaction_repository.get_by_user_id(user_id)
     
+    def get_transactions_with_tickets_by_user(self, user_id: int) -> List[Tuple[Transaction, Optional[Ticket], Optional[str]]]:
+        """(transaction, ticket, counterparty username) rows for list views, in one query"""
+        return self.transaction_repository.get_by_user_id_with_ticket(user_id)
+    
     def get_transactions_by_ticket(self, ticket_id: int) -> List[Transaction]:
         return self.transaction_repository.get_by_ticket_id(ticket_id)
     
-    def list_transactions(self) -> List[Transaction]:
-        return self.transaction_repository.list()
+    def list_transactions(self, after_id: int = 0, limit: int = 200) -> List[Transaction]:
+        """One keyset page of transactions; pass the last TransactionID as after_id for the next"""
+        return self.transaction_repository.list_page(after_id, limit)
+    
+    def iter_transactions(self) -> Iterator[Transaction]:
+        """Stream all transactions (exports) without materializing the table"""
+        return self.transaction_repository.iter_all()
@@ -24,23 +24,17 @@ class UserService:
 
     def update_user(self, user_id: int, phone_number: str, username: str, status: str,
                     date_of_birth, role_id: int) -> User:
-        user = User(id=user_id, phone_number=phone_number, username=username, status=status,
-                    password_hash=None, email=None, date_of_birth=date_of_birth,
-                    create_date=None, role_id=role_id)
-        return self.repository.update(user)
+        return self.update_profile(user_id, phone_number=phone_number, username=username, status=status,
+                                   date_of_birth=date_of_birth, role_id=role_id)
 
     def update_profile(self, user_id: int, **kwargs) -> User:
         """Update user profile with provided fields"""
-        user = self.repository.get_by_id(user_id)
+        # Update only provided fields, in one UPDATE ... RETURNING
+        fields = {key: value for key, value in kwargs.items() if value is not None}
+        user = self.repository.update_fields(user_id, **fields)
         if not user:
             raise ValueError("User not found")
-        
-        # Update only provided fields
-        for key, value in kwargs.items():
-            if hasattr(user, key) and value is not None:
-                setattr(user, key, value)
-        
-        return self.repository.update(user)
+        return user
 
     def search_users(self, query: str = '', verified: str = None, min_rating: str = None, status: str = None) -> List[User]:
         """Search users by criteria"""
@@ -4,40 +4,95 @@ Message encryption utilities for secure chat
 
 import os
 import base64
-from cryptography.fernet import Fernet
+import re
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from functools import lru_cache
+from typing import List, Optional
 import logging
 
+# AES-GCM nonce and authentication tag sizes, in bytes
+_NONCE_SIZE = 12
+_TAG_SIZE = 16
+# Length of the base64 token for an empty message (nonce + tag)
+_MIN_TOKEN_LENGTH = 4 * -(-(_NONCE_SIZE + _TAG_SIZE) // 3)
+# Shape of a urlsafe base64 token
+_TOKEN_RE = re.compile(r'[A-Za-z0-9_-]+={0,2}')
+# Messages shorter than this (typing pings, presence, "ok") are stored as
+# plaintext by encrypt_message_content: encrypting them costs more than it hides
+MIN_ENCRYPT_LEN = 16
+# HKDF domain separation for the chat message key
+_KDF_SALT = b'chat-v1'
+_KDF_INFO = b'msg-aead'
+
 class MessageEncryption:
     """Handle message encryption and decryption"""
     
+    # Fixed attribute set: no per-instance __dict__
+    __slots__ = ('password', '_aead')
+    
     def __init__(self, password: str = None):
         """Initialize encryption with password or environment variable"""
         if password is None:
             password = os.getenv('CHAT_ENCRYPTION_KEY', 'default-chat-key-change-in-production')
         
         self.password = password.encode()
-        self.salt = b'stable_salt_for_chat'  # In production, use random salt per message
-        
+        # One static key per instance; each message gets its own random nonce
+        self._aead = AESGCM(self._get_key())
+    
+    @property
+    def aead(self) -> AESGCM:
+        """AES-256-GCM cipher built once from the derived key"""
+        return self._aead
+    
+    def __getstate__(self) -> bytes:
+        """Pickle only the password; the cipher object is not picklable"""
+        return self.password
+    
+    def __setstate__(self, password: bytes) -> None:
+        """Restore from the password and derive the key again"""
+        self.password = password
+        self._aead = AESGCM(self._get_key())
+    
+    def invalidate(self) -> None:
+        """Derive the key again (e.g. after changing password)"""
+        self._aead = AESGCM(self._get_key())
+    
     def _get_key(self) -> bytes:
-        """Generate encryption key from password"""
-        kdf = PBKDF2HMAC(
+        """Derive the 32-byte encryption key from password"""
+        # The password is a server-side secret (CHAT_ENCRYPTION_KEY), not a
+        # user password, so HKDF is enough; no key stretching needed
+        return HKDF(
             algorithm=hashes.SHA256(),
             length=32,
-            salt=self.salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(self.password))
-        return key
+            salt=_KDF_SALT,
+            info=_KDF_INFO
+        ).derive(self.password)
+    
+    def encrypt_bytes(self, data: bytes) -> bytes:
+        """
+        Encrypt raw bytes into an ASCII token (urlsafe base64 of nonce + ciphertext);
+        raises on failure, no fallback
+        """
+        # Fresh random nonce per message, stored in front of the ciphertext
+        nonce = os.urandom(_NONCE_SIZE)
+        return base64.urlsafe_b64encode(nonce + self.aead.encrypt(nonce, data, None))
+    
+    def decrypt_bytes(self, token: bytes) -> bytes:
+        """
+        Decrypt a token produced by encrypt_bytes back to raw bytes;
+        raises on failure, no fallback
+        """
+        data = base64.urlsafe_b64decode(token)
+        # Decrypt (also verifies the authentication tag)
+        return self.aead.decrypt(data[:_NONCE_SIZE], data[_NONCE_SIZE:], None)
     
     def encrypt_message(self, message: str) -> str:
         """Encrypt a message"""
         try:
-            key = self._get_key()
-            f = Fernet(key)
-            encrypted_message = f.encrypt(message.encode())
-            return base64.urlsafe_b64encode(encrypted_message).decode()
+            # str <-> bytes only at this boundary
+            return self.encrypt_bytes(message.encode()).decode('ascii')
         except Exception as e:
             logging.error(f"Error encrypting message: {str(e)}")
             # Return original message if encryption fails (fallback)
@@ -46,40 +101,79 @@ class MessageEncryption:
     def decrypt_message(self, encrypted_message: str) -> str:
         """Decrypt a message"""
         try:
-            key = self._get_key()
-            f = Fernet(key)
-            
-            # Decode from base64
-            encrypted_data = base64.urlsafe_b64decode(encrypted_message.encode())
-            
-            # Decrypt
-            decrypted_message = f.decrypt(encrypted_data)
-            return decrypted_message.decode()
+            return self.decrypt_bytes(encrypted_message.encode('ascii')).decode()
         except Exception as e:
             logging.error(f"Error decrypting message: {str(e)}")
             # Return encrypted message if decryption fails (fallback)
             return encrypted_message
     
+    def decrypt_messages(self, encrypted_messages: List[str]) -> List[str]:
+        """
+        Decrypt many messages (e.g. a chat history page) with one cipher
+        lookup and a tight loop; failures fall back per message like decrypt_message
+        """
+        aead = self.aead
+        b64decode = base64.urlsafe_b64decode
+        results = []
+        for encrypted_message in encrypted_messages:
+            if not self.is_encrypted(encrypted_message):
+                # Short messages are stored as plaintext
+                results.append(encrypted_message)
+                continue
+            try:
+                data = b64decode(encrypted_message.encode('ascii'))
+                results.append(aead.decrypt(data[:_NONCE_SIZE], data[_NONCE_SIZE:], None).decode())
+            except Exception as e:
+                logging.error(f"Error decrypting message: {str(e)}")
+                results.append(encrypted_message)
+        return results
+    
     def is_encrypted(self, message: str) -> bool:
         """Check if a message appears to be encrypted"""
-        try:
-            # Try to decode as base64
-            base64.urlsafe_b64decode(message.encode())
-            # If successful and contains typical encrypted data patterns
-            return len(message) > 50 and '=' in message
-        except:
-            return False
+        # Nonce + tag is the minimum for even an empty message; the charset and
+        # padding are checked by one precompiled regex, with no decode attempt
+        return (len(message) >= _MIN_TOKEN_LENGTH and len(message) % 4 == 0
+                and _TOKEN_RE.fullmatch(message) is not None)
 
 # Global encryption instance
 message_encryptor = MessageEncryption()
 
-def encrypt_message_content(content: str) -> str:
-    """Encrypt message content"""
-    return message_encryptor.encrypt_message(content)
+# Upper bound on per-key encryptors kept alive; each one holds its key in
+# memory, so least recently used keys are evicted past this many
+_MAX_CACHED_ENCRYPTORS = 32
+
+@lru_cache(maxsize=_MAX_CACHED_ENCRYPTORS)
+def _encryptor_for(key: str) -> MessageEncryption:
+    """
+    Encryptor per encryption key, so the key derivation runs once per key.
+    Can be dropped with _encryptor_for.cache_clear()
+    """
+    return MessageEncryption(key)
+
+def _encryptor(key: Optional[str]) -> MessageEncryption:
+    """Global encryptor, or the one for the given key"""
+    return message_encryptor if key is None else _encryptor_for(key)
+
+def encrypt_message_content(content: str, key: Optional[str] = None) -> str:
+    """
+    Encrypt message content; content shorter than MIN_ENCRYPT_LEN is
+    metadata-trivial and returned unchanged (not encrypted).
+    key is the encryption secret to use (None = CHAT_ENCRYPTION_KEY)
+    """
+    if len(content) < MIN_ENCRYPT_LEN:
+        return content
+    return _encryptor(key).encrypt_message(content)
+
+def decrypt_message_content(encrypted_content: str, key: Optional[str] = None) -> str:
+    """Decrypt message content; plaintext (short) content is returned as is"""
+    encryptor = _encryptor(key)
+    if not encryptor.is_encrypted(encrypted_content):
+        return encrypted_content
+    return encryptor.decrypt_message(encrypted_content)
 
-def decrypt_message_content(encrypted_content: str) -> str:
-    """Decrypt message content"""
-    return message_encryptor.decrypt_message(encrypted_content)
+def decrypt_messages_content(encrypted_contents: List[str], key: Optional[str] = None) -> List[str]:
+    """Decrypt a batch of message contents"""
+    return _encryptor(key).decrypt_messages(encrypted_contents)
 
 def is_message_encrypted(content: str) -> bool:
     """Check if message content is encrypted"""
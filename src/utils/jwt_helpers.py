@@ -2,32 +2,95 @@
 JWT Helper Functions for Role-Based Authentication
 """
 
-from flask_jwt_extended import get_jwt_identity, get_jwt
 from typing import Dict, Any, Optional
 import json
 
+# Optional: faster parsing of legacy JSON identities
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
-def create_jwt_identity(user_id: int, role_id: int, username: str = None) -> str:
+
+def create_jwt_identity(user_id: int, role_id: int = None, username: str = None) -> str:
     """
-    Create JWT identity payload with user info and role
+    Create JWT identity (the subject): just the user ID.
+    Role and username travel as claims, see create_jwt_claims.
     
     Args:
         user_id: User ID
+        role_id: Unused, kept for call compatibility
+        username: Unused, kept for call compatibility
+        
+    Returns:
+        User ID as string
+    """
+    return str(user_id)
+
+
+def create_jwt_claims(role_id: int, username: str = None) -> Dict[str, Any]:
+    """
+    Create additional JWT claims with the user's role
+    (pass as additional_claims to create_access_token)
+    
+    Args:
         role_id: User role ID (1=Admin, 2=User)
         username: Optional username for debugging
         
     Returns:
-        JSON string containing user identity
+        Dict of claims
     """
-    identity_data = {
-        "user_id": user_id,
-        "role_id": role_id
-    }
+    claims = {"role_id": role_id}
     
     if username:
-        identity_data["username"] = username
+        claims["username"] = username
         
-    return json.dumps(identity_data)
+    return claims
+
+
+def _parsed_identity() -> Dict[str, Any]:
+    """
+    Parse the JWT identity once per request and keep the result on flask.g,
+    so helpers called several times in one request don't repeat the work
+    
+    Returns:
+        Dict with user_id, role_id, username and is_admin
+    """
+    from flask import g, has_request_context
+    from flask_jwt_extended import get_jwt_identity, get_jwt
+    
+    if has_request_context():
+        cached = g.get('_jwt_identity_cache')
+        if cached is not None:
+            return cached
+    
+    identity = get_jwt_identity()
+    if isinstance(identity, str) and not identity.isdigit():
+        # Tokens issued before role claims carry a JSON identity
+        try:
+            source = _json_loads(identity)
+        except json.JSONDecodeError:
+            source = None
+        if not isinstance(source, dict) or "user_id" not in source:
+            raise ValueError("JWT identity has no user_id")
+        user_id = source["user_id"]
+    else:
+        # Identity is the user_id; role and username are claims (already a dict)
+        source = get_jwt()
+        user_id = identity
+    
+    role_id = int(source.get("role_id", Roles.USER))
+    info = {
+        "user_id": int(user_id),
+        "role_id": role_id,
+        "username": source.get("username"),
+        "is_admin": role_id == Roles.ADMIN
+    }
+    
+    if has_request_context():
+        g._jwt_identity_cache = info
+    return info
 
 
 def get_current_user_id() -> int:
@@ -41,20 +104,7 @@ def get_current_user_id() -> int:
         ValueError: If token is invalid or missing
     """
     try:
-        identity = get_jwt_identity()
-        
-        # Handle both old format (string) and new format (JSON)
-        if isinstance(identity, str):
-            try:
-                # Try to parse as JSON (new format)
-                identity_data = json.loads(identity)
-                return int(identity_data["user_id"])
-            except (json.JSONDecodeError, KeyError):
-                # Fallback to old format (just user_id as string)
-                return int(identity)
-        
-        return int(identity)
-        
+        return _parsed_identity()["user_id"]
     except Exception as e:
         raise ValueError(f"Invalid JWT token: {e}")
 
@@ -70,19 +120,7 @@ def get_current_user_role() -> int:
         ValueError: If token is invalid or role not found
     """
     try:
-        identity = get_jwt_identity()
-        
-        if isinstance(identity, str):
-            try:
-                # Parse JSON format
-                identity_data = json.loads(identity)
-                return int(identity_data["role_id"])
-            except (json.JSONDecodeError, KeyError):
-                # Old format doesn't have role - assume regular user
-                return 2  # Default to regular user
-        
-        return 2  # Default fallback
-        
+        return _parsed_identity()["role_id"]
     except Exception as e:
         raise ValueError(f"Invalid JWT token: {e}")
 
@@ -98,35 +136,8 @@ def get_current_user_info() -> Dict[str, Any]:
         ValueError: If token is invalid
     """
     try:
-        identity = get_jwt_identity()
-        
-        if isinstance(identity, str):
-            try:
-                # Parse JSON format
-                identity_data = json.loads(identity)
-                return {
-                    "user_id": int(identity_data["user_id"]),
-                    "role_id": int(identity_data["role_id"]),
-                    "username": identity_data.get("username"),
-                    "is_admin": int(identity_data["role_id"]) == 1
-                }
-            except (json.JSONDecodeError, KeyError):
-                # Fallback to old format
-                return {
-                    "user_id": int(identity),
-                    "role_id": 2,  # Default to regular user
-                    "username": None,
-                    "is_admin": False
-                }
-        
-        # Fallback
-        return {
-            "user_id": int(identity),
-            "role_id": 2,
-            "username": None,
-            "is_admin": False
-        }
-        
+        # Copy so callers can't modify the per-request cache
+        return dict(_parsed_identity())
     except Exception as e:
         raise ValueError(f"Invalid JWT token: {e}")
 
@@ -139,9 +150,8 @@ def is_admin() -> bool:
         True if user is admin (role_id = 1), False otherwise
     """
     try:
-        role_id = get_current_user_role()
-        return role_id == 1
-    except:
+        return _parsed_identity()["is_admin"]
+    except (ValueError, KeyError, TypeError, RuntimeError):
         return False
 
 
@@ -157,17 +167,16 @@ def is_user_or_admin(target_user_id: int) -> bool:
         True if access allowed, False otherwise
     """
     try:
-        current_user_id = get_current_user_id()
-        current_role = get_current_user_role()
+        info = _parsed_identity()
         
         # Admin can access anyone
-        if current_role == 1:
+        if info["is_admin"]:
             return True
             
         # User can access their own data
-        return current_user_id == target_user_id
+        return info["user_id"] == target_user_id
         
-    except:
+    except (ValueError, KeyError, TypeError, RuntimeError):
         return False
 
 
@@ -179,11 +188,18 @@ def get_jwt_claims() -> Dict[str, Any]:
         Dict with JWT claims
     """
     try:
+        from flask_jwt_extended import get_jwt
         return get_jwt()
-    except:
+    except RuntimeError:
+        # Outside a request context, or no JWT was verified for this request
         return {}
 
 
+# Role lookups built once instead of on every call (1=Admin, 2=User)
+_ROLE_NAMES = {1: "Admin", 2: "User"}
+_VALID_ROLES = frozenset(_ROLE_NAMES)
+
+
 # Role constants for better code readability
 class Roles:
     ADMIN = 1
@@ -192,13 +208,9 @@ class Roles:
     @classmethod
     def is_valid_role(cls, role_id: int) -> bool:
         """Check if role_id is valid"""
-        return role_id in [cls.ADMIN, cls.USER]
+        return role_id in _VALID_ROLES
     
     @classmethod
     def get_role_name(cls, role_id: int) -> str:
         """Get human-readable role name"""
-        role_names = {
-            cls.ADMIN: "Admin",
-            cls.USER: "User"
-        }
-        return role_names.get(role_id, "Unknown")
+        return _ROLE_NAMES.get(role_id, "Unknown")
\ No newline at end of file
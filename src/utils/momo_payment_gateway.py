@@ -2,13 +2,49 @@ import hmac
 import json
 import uuid
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, Any, Optional
 from datetime import datetime
 import logging
-import hashlib
+
+# Optional: only needed for the async request path
+try:
+    import httpx
+except ImportError:
+    httpx = None
 
 logger = logging.getLogger(__name__)
 
+# Fields signed for a create-payment request, in the order MoMo requires
+_CREATE_SIGNATURE_FIELDS = (
+    'accessKey', 'amount', 'extraData', 'ipnUrl', 'orderId',
+    'orderInfo', 'partnerCode', 'redirectUrl', 'requestId', 'requestType'
+)
+
+# Fields signed for a transaction-status query
+_STATUS_SIGNATURE_FIELDS = ('accessKey', 'orderId', 'partnerCode', 'requestId')
+
+# Fields included in IPN signature verification, in MoMo's order
+_IPN_SIGNATURE_FIELDS = (
+    'partnerCode', 'orderId', 'requestId', 'amount', 'orderInfo',
+    'orderType', 'transId', 'resultCode', 'message', 'payType',
+    'responseTime', 'extraData', 'accessKey'
+)
+
+# HTTP session shared by all gateway instances so concurrent payment requests
+# reuse pooled keep-alive connections (no TCP/TLS handshake per order)
+_http_session = requests.Session()
+# POST is not in Retry's default allowed_methods, so only connection failures
+# (request never reached MoMo) are retried - a payment is never sent twice
+_http_session.mount('https://', HTTPAdapter(
+    pool_connections=16, pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+))
+
+# (connect, read) timeouts so a stalled gateway can't block a worker forever
+_HTTP_TIMEOUT = (3.05, 10)
+
 class MomoPaymentGateway:
     def __init__(self, partner_code: str, access_key: str, secret_key: str, api_endpoint: str):
         """
@@ -24,6 +60,55 @@ class MomoPaymentGateway:
         self.access_key = access_key
         self.secret_key = secret_key
         self.api_endpoint = api_endpoint
+        # Encoded once; every request and IPN is signed with this key
+        self._secret_key_bytes = secret_key.encode('utf-8')
+        # Created on first async call; bound to the event loop that made it
+        self._async_client = None
+        # Fields that are the same in every request body, copied per call
+        self._create_body_template = {
+            "partnerCode": partner_code,
+            "accessKey": access_key,
+            "requestType": "payWithATM",
+            "lang": "vi"
+        }
+        self._status_body_template = {
+            "partnerCode": partner_code,
+            "accessKey": access_key
+        }
+    
+    def _sign(self, raw_signature: str) -> bytes:
+        # One-shot HMAC-SHA256 (OpenSSL); no intermediate HMAC object
+        return hmac.digest(self._secret_key_bytes, raw_signature.encode('utf-8'), 'sha256')
+    
+    def _build_payment_request(self, order_id: str, amount: int, order_info: str, return_url: str,
+                               notify_url: str, extra_data: str, bank_code: Optional[str],
+                               card_token: Optional[str]) -> Dict[str, Any]:
+        """Build the signed create-payment body shared by the sync and async paths"""
+        # Create request body from the static fields; the signature is computed over its fields
+        data = self._create_body_template.copy()
+        data["requestId"] = uuid.uuid4().hex
+        # Convert amount to integer as required by MoMo
+        data["amount"] = int(amount)
+        data["orderId"] = order_id
+        data["orderInfo"] = order_info
+        data["redirectUrl"] = return_url
+        data["ipnUrl"] = notify_url
+        data["extraData"] = extra_data
+        
+        # Xây chuỗi chữ ký đúng thứ tự theo tài liệu MoMo
+        raw_signature = "&".join(f"{field}={data[field]}" for field in _CREATE_SIGNATURE_FIELDS)
+        if bank_code:
+            data["bankCode"] = bank_code
+            raw_signature += f"&bankCode={bank_code}"
+        if card_token:
+            data["cardToken"] = card_token
+            raw_signature += f"&cardToken={card_token}"
+        
+        # Create signature
+        signature = self._sign(raw_signature)
+        logger.debug("Raw signature for MoMo: %s", raw_signature)
+        data["signature"] = signature.hex()
+        return data
     
     def create_payment_request(self, 
                                order_id: str, 
@@ -48,63 +133,14 @@ class MomoPaymentGateway:
         Returns:
             Dict with payment request result including payUrl
         """
-        # Create request data
-        request_id = str(uuid.uuid4())
-        request_type = "payWithATM"
-        
-        # Convert amount to integer as required by MoMo
-        amount = int(amount)
-        
-        # Create raw signature
-        # Create raw signature by sorting parameters alphabetically
-        # Xây chuỗi chữ ký đúng thứ tự theo tài liệu MoMo
-        raw_signature = (
-            f"accessKey={self.access_key}&"
-            f"amount={amount}&"
-            f"extraData={extra_data}&"
-            f"ipnUrl={notify_url}&"
-            f"orderId={order_id}&"
-            f"orderInfo={order_info}&"
-            f"partnerCode={self.partner_code}&"
-            f"redirectUrl={return_url}&"
-            f"requestId={request_id}&"
-            f"requestType={request_type}"
-        )
-        if bank_code:
-            raw_signature += f"&bankCode={bank_code}"
-        if card_token:
-            raw_signature += f"&cardToken={card_token}"
+        data = self._build_payment_request(order_id, amount, order_info, return_url, notify_url,
+                                           extra_data, bank_code, card_token)
         
-        # Create signature
-        h = hmac.new(bytes(self.secret_key, 'utf-8'), bytes(raw_signature, 'utf-8'), hashlib.sha256)
-        logger.debug(f"Raw signature for MoMo: {raw_signature}")
-        signature = h.hexdigest()
-        
-        # Create request body
-        data = {
-            "partnerCode": self.partner_code,
-            "accessKey": self.access_key,
-            "requestId": request_id,
-            "amount": amount,
-            "orderId": order_id,
-            "orderInfo": order_info,
-            "redirectUrl": return_url,
-            "ipnUrl": notify_url,
-            "extraData": extra_data,
-            "requestType": request_type,
-            "signature": signature,
-            "lang": "vi"
-        }
-        if bank_code:
-            data["bankCode"] = bank_code
-        if card_token:
-            data["cardToken"] = card_token
-        
-        logger.info(f"Creating MoMo payment request for order {order_id} with amount {amount}")
+        logger.info(f"Creating MoMo payment request for order {order_id} with amount {data['amount']}")
         
         try:
             # Send request to MoMo
-            response = requests.post(self.api_endpoint, json=data)
+            response = _http_session.post(self.api_endpoint, json=data, timeout=_HTTP_TIMEOUT)
             response_json = response.json()
             
             logger.info(f"MoMo payment request response for order {order_id}: {response_json}. Response time: {response_json.get('responseTime')}")
@@ -131,33 +167,35 @@ class MomoPaymentGateway:
             
         received_signature = ipn_params['signature']
         
-        # List of fields to include in signature verification
-        signature_fields = [
-            'partnerCode', 'orderId', 'requestId', 'amount', 'orderInfo',
-            'orderType', 'transId', 'resultCode', 'message', 'payType',
-            'responseTime', 'extraData', 'accessKey'
-        ]
-        
         # Create raw signature string
-        field_values = []
-        for field in signature_fields:
-            if field in ipn_params:
-                field_values.append(f"{field}={ipn_params[field]}")
-        
-        raw_signature = "&".join(field_values)
+        raw_signature = "&".join(
+            f"{field}={ipn_params[field]}" for field in _IPN_SIGNATURE_FIELDS if field in ipn_params
+        )
         
         # Create signature
-        h = hmac.new(bytes(self.secret_key, 'utf-8'), bytes(raw_signature, 'utf-8'), hashlib.sha256)
-        calculated_signature = h.hexdigest()
+        digest = self._sign(raw_signature)
         
-        # Compare signatures
-        is_valid = calculated_signature == received_signature
+        # Constant-time compare on the raw digest bytes
+        try:
+            is_valid = hmac.compare_digest(digest, bytes.fromhex(str(received_signature)))
+        except ValueError:
+            is_valid = False
         
         if not is_valid:
-            logger.warning(f"Invalid MoMo IPN signature. Calculated: {calculated_signature}, Received: {received_signature}")
+            logger.warning(f"Invalid MoMo IPN signature. Calculated: {digest.hex()}, Received: {received_signature}")
         
         return is_valid
     
+    def _build_status_request(self, order_id: str, request_id: str) -> Dict[str, Any]:
+        """Build the signed transaction-status body shared by the sync and async paths"""
+        # Create request body; the signature is computed over its fields
+        data = self._status_body_template.copy()
+        data["requestId"] = request_id
+        data["orderId"] = order_id
+        raw_signature = "&".join(f"{field}={data[field]}" for field in _STATUS_SIGNATURE_FIELDS)
+        data["signature"] = self._sign(raw_signature).hex()
+        return data
+    
     def get_transaction_status(self, order_id: str, request_id: str) -> Dict[str, Any]:
         """
         Check the status of a transaction
@@ -169,26 +207,77 @@ class MomoPaymentGateway:
         Returns:
             Dict with transaction status
         """
-        # Create raw signature
-        raw_signature = f"accessKey={self.access_key}&orderId={order_id}&partnerCode={self.partner_code}&requestId={request_id}"
+        data = self._build_status_request(order_id, request_id)
         
-        # Create signature
-        h = hmac.new(bytes(self.secret_key, 'utf-8'), bytes(raw_signature, 'utf-8'), hashlib.sha256)
-        signature = h.hexdigest()
+        try:
+            # Send request to MoMo
+            query_url = self.api_endpoint.replace('/create', '/query')
+            response = _http_session.post(query_url, json=data, timeout=_HTTP_TIMEOUT)
+            response_json = response.json()
+            
+            logger.info(f"MoMo transaction status for order {order_id}: {response_json}")
+            
+            return response_json
+        except Exception as e:
+            logger.error(f"Error checking MoMo transaction status: {e}")
+            raise ValueError(f"Failed to check MoMo transaction status: {e}")
+    
+    def _get_async_client(self):
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                timeout=httpx.Timeout(10, connect=3.05)
+            )
+        return self._async_client
+    
+    async def create_payment_request_async(self,
+                                           order_id: str,
+                                           amount: int,
+                                           order_info: str,
+                                           return_url: str,
+                                           notify_url: str,
+                                           extra_data: str = "",
+                                           bank_code: Optional[str] = None,
+                                           card_token: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Create a payment request to MoMo without blocking the event loop
         
-        # Create request body
-        data = {
-            "partnerCode": self.partner_code,
-            "accessKey": self.access_key,
-            "requestId": request_id,
-            "orderId": order_id,
-            "signature": signature
-        }
+        Same arguments and result as create_payment_request.
+        """
+        if httpx is None:
+            raise ValueError("Failed to create MoMo payment: httpx is not installed")
+        
+        data = self._build_payment_request(order_id, amount, order_info, return_url, notify_url,
+                                           extra_data, bank_code, card_token)
+        
+        logger.info(f"Creating MoMo payment request for order {order_id} with amount {data['amount']}")
+        
+        try:
+            response = await self._get_async_client().post(self.api_endpoint, json=data)
+            response_json = response.json()
+            
+            logger.info(f"MoMo payment request response for order {order_id}: {response_json}. Response time: {response_json.get('responseTime')}")
+            
+            return response_json
+        except Exception as e:
+            logger.error(f"Error creating MoMo payment request: {e}")
+            raise ValueError(f"Failed to create MoMo payment: {e}")
+    
+    async def get_transaction_status_async(self, order_id: str, request_id: str) -> Dict[str, Any]:
+        """
+        Check the status of a transaction without blocking the event loop
+        
+        Same arguments and result as get_transaction_status.
+        """
+        if httpx is None:
+            raise ValueError("Failed to check MoMo transaction status: httpx is not installed")
+        
+        data = self._build_status_request(order_id, request_id)
         
         try:
-            # Send request to MoMo
             query_url = self.api_endpoint.replace('/create', '/query')
-            response = requests.post(query_url, json=data)
+            response = await self._get_async_client().post(query_url, json=data)
             response_json = response.json()
             
             logger.info(f"MoMo transaction status for order {order_id}: {response_json}")
@@ -198,6 +287,12 @@ class MomoPaymentGateway:
             logger.error(f"Error checking MoMo transaction status: {e}")
             raise ValueError(f"Failed to check MoMo transaction status: {e}")
     
+    async def aclose(self) -> None:
+        """Close the async HTTP client, if one was created"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+    
     def process_payment_callback(self, callback_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Process payment callback from MoMo and update payment status